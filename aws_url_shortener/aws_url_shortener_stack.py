@@ -1,20 +1,152 @@
+import math
+import os
+import shutil
+import tempfile
+
 from aws_cdk import (
     core,
+    aws_dax as dax,
     aws_dynamodb as ddb,
+    aws_ec2 as ec2,
     aws_lambda as _lambda,
+    aws_lambda_event_sources as event_sources,
     aws_logs as logs,
     aws_iam as iam,
     aws_apigateway as apigw,
+    aws_apigatewayv2 as apigwv2,
+    aws_applicationautoscaling as appscaling,
     aws_s3 as s3,
     aws_s3_deployment as s3deploy,
+    aws_sqs as sqs,
     aws_cloudfront as cf,
+    aws_events as events,
+    aws_events_targets as targets,
 )
 
+from .lambda_environment import proxy_environment
+
+# Symbols of each Short URL code alphabet, and the fewest code bits (2^32 codes) a shortened code_length may keep,
+# so that a new code rarely hits one of hundreds of millions of stored Short URLs and MAX_RETRIES regenerations suffice
+CODE_ALPHABET_SIZES = {"hex": 16, "base62": 62, "base58": 58, "base32": 32}
+MIN_CODE_BITS = 32
+
+
+def staged_asset(name, *files):
+    '''
+    Directory holding a copy of the given files, to build a Lambda function's code from files of several directories
+    (no symbolic link, which Windows checkouts don't keep); staged at every synthesis, from the current files;
+    '''
+    directory = os.path.join(tempfile.mkdtemp(prefix="url_shortener_"), name)
+    os.makedirs(directory)
+
+    for file in files:
+        shutil.copy(file, directory)
+
+    return directory
+
 class AwsUrlShortenerStack(core.Stack):
 
     def __init__(self, scope: core.Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
+        # Source of the unique values fed to the hash ("counter" or the counter-free "snowflake")
+        id_generator = self.node.try_get_context("id_generator") or "counter"
+
+        # Serve a repeated Long URL with its existing Short URL instead of storing a new one
+        dedupe = str(self.node.try_get_context("dedupe")).lower() == "true"
+
+        # Seconds CloudFront (and browsers) may cache redirects and 404s for
+        redirect_cache_ttl = int(self.node.try_get_context("redirect_cache_ttl") or 0)
+        redirect_browser_ttl = int(self.node.try_get_context("redirect_browser_ttl") or 0)
+        not_found_cache_ttl = int(self.node.try_get_context("not_found_cache_ttl") or 0)
+
+        # API Gateway flavour serving the APIs: "rest" (REST API) or "http" (HTTP API, payload format 2.0)
+        api_type = self.node.try_get_context("api_type") or "rest"
+
+        # DDB capacity mode: "provisioned" (autoscaled between a floor and a ceiling) or "pay_per_request" (on-demand)
+        billing_mode = (self.node.try_get_context("billing_mode") or "provisioned").lower()
+        ddb_min_read_capacity = int(self.node.try_get_context("ddb_min_read_capacity") or 10)
+        ddb_min_write_capacity = int(self.node.try_get_context("ddb_min_write_capacity") or 10)
+        ddb_max_capacity = int(self.node.try_get_context("ddb_max_capacity") or 40000)
+        ddb_target_utilization = int(self.node.try_get_context("ddb_target_utilization") or 70)
+        ddb_scaling_schedules = self.node.try_get_context("ddb_scaling_schedules") or []
+
+        if billing_mode not in ("provisioned", "pay_per_request"):
+            raise ValueError("billing_mode must be either provisioned or pay_per_request")
+
+        # Alphabet ("hex", "base62", "base58" or Crockford's "base32") and length (0 for the full digest) of the Short URL codes
+        code_alphabet = self.node.try_get_context("code_alphabet") or "hex"
+        code_length = int(self.node.try_get_context("code_length") or 0)
+
+        if code_alphabet not in CODE_ALPHABET_SIZES:
+            raise ValueError("code_alphabet must be one of " + ", ".join(CODE_ALPHABET_SIZES))
+
+        min_code_length = math.ceil(MIN_CODE_BITS / math.log2(CODE_ALPHABET_SIZES[code_alphabet]))
+
+        if 0 < code_length < min_code_length:
+            raise ValueError(f"code_length must be 0 (the full digest) or at least {min_code_length} {code_alphabet} characters")
+
+        # Deploy the shorten (writer) and unshorten (reader) APIs as two separately sized functions instead of one
+        split_functions = str(self.node.try_get_context("split_functions")).lower() == "true"
+        shorten_memory_size = int(self.node.try_get_context("shorten_memory_size") or 128)
+        shorten_timeout = int(self.node.try_get_context("shorten_timeout") or 10)
+        shorten_reserved_concurrency = int(self.node.try_get_context("shorten_reserved_concurrency") or 0)
+        unshorten_memory_size = int(self.node.try_get_context("unshorten_memory_size") or 128)
+        unshorten_timeout = int(self.node.try_get_context("unshorten_timeout") or 10)
+        unshorten_reserved_concurrency = int(self.node.try_get_context("unshorten_reserved_concurrency") or 0)
+
+        # DAX cluster serving the reads of the unshorten Lambda function, which then runs in a VPC
+        dax_enabled = str(self.node.try_get_context("dax")).lower() == "true"
+        dax_node_type = self.node.try_get_context("dax_node_type") or "dax.t3.small"
+        dax_nodes = int(self.node.try_get_context("dax_nodes") or 3)
+        dax_item_ttl = int(self.node.try_get_context("dax_item_ttl") or 300)
+
+        # The DAX client isn't part of the Lambda runtime, it's shipped in a layer built beforehand
+        if dax_enabled and not os.path.isdir(os.path.join("dax_layer", "python")):
+            raise ValueError("The DAX read path (dax=true) requires the DAX client layer: pip install amazon-dax-client -t dax_layer/python")
+
+        # Click analytics: redirects are queued to SQS in batches per container and rolled up into a counts table
+        click_analytics = str(self.node.try_get_context("click_analytics")).lower() == "true"
+        click_batch_size = int(self.node.try_get_context("click_batch_size") or 100)
+        click_flush_seconds = int(self.node.try_get_context("click_flush_seconds") or 10)
+        click_shards = int(self.node.try_get_context("click_shards") or 4)
+
+        # The edge hot-set answers the hottest redirects without the Lambda function, so they couldn't be counted
+        if click_analytics and str(self.node.try_get_context("edge_tier")).lower() == "true":
+            raise ValueError("Click analytics (click_analytics=true) can't be combined with the edge tier (edge_tier=true)")
+
+        # Pre-initialized containers for the (unshorten) Lambda function (0 disables provisioned concurrency)
+        provisioned_concurrency = int(self.node.try_get_context("provisioned_concurrency") or 0)
+        provisioned_concurrency_max = int(self.node.try_get_context("provisioned_concurrency_max") or 0)
+        provisioned_concurrency_utilization = float(self.node.try_get_context("provisioned_concurrency_utilization") or 0.7)
+        provisioned_concurrency_schedules = self.node.try_get_context("provisioned_concurrency_schedules") or []
+
+        # Resolve the most requested Short URLs at the edge from a periodically refreshed hot-set
+        edge_tier = str(self.node.try_get_context("edge_tier")).lower() == "true"
+        edge_hotset_size = int(self.node.try_get_context("edge_hotset_size") or 1000)
+        edge_refresh_minutes = int(self.node.try_get_context("edge_refresh_minutes") or 5)
+
+        # Lambda@Edge functions can only be deployed from us-east-1
+        if edge_tier and not core.Token.is_unresolved(self.region) and self.region != "us-east-1":
+            raise ValueError("The edge tier (edge_tier=true) requires the stack to be deployed in us-east-1")
+
+        # Capacity of the DDB tables and indexes: on-demand ("pay_per_request"), or provisioned with autoscaling
+        provisioned = billing_mode == "provisioned"
+        capacity = {"read_capacity": ddb_min_read_capacity, "write_capacity": ddb_min_write_capacity} if provisioned else {}
+        table_billing_mode = ddb.BillingMode.PROVISIONED if provisioned else ddb.BillingMode.PAY_PER_REQUEST
+
+        def auto_scale(scalable_capacity):
+            # AutoScaling on utilization, which takes minutes to react, plus the scheduled floors ahead of known peaks
+            scalable_capacity.scale_on_utilization(target_utilization_percent=ddb_target_utilization)
+
+            for schedule in ddb_scaling_schedules:
+                scalable_capacity.scale_on_schedule(
+                    schedule["name"],
+                    schedule=appscaling.Schedule.expression(schedule["expression"]),
+                    min_capacity=schedule.get("min_capacity"),
+                    max_capacity=schedule.get("max_capacity"),
+                )
+
         # DDB table to store the Long and Short URLs with Short URL as the partition key
         url_mapping_table = ddb.Table(
             self,
@@ -23,119 +155,571 @@ class AwsUrlShortenerStack(core.Stack):
                 name="short_url", 
                 type=ddb.AttributeType.STRING
             ),
-            read_capacity=10,
-            write_capacity=10,
+            billing_mode=table_billing_mode,
+            # Expiring Short URLs are deleted by DynamoDB once past their expiry, without consuming write capacity
+            time_to_live_attribute="expires_at",
             removal_policy=core.RemovalPolicy.DESTROY,
+            **capacity,
         )
 
-        # AutoScaling of RCUs with a Target Utilization of 70%
-        url_mapping_table.auto_scale_read_capacity(
-            min_capacity=10, max_capacity=40000
-        ).scale_on_utilization(target_utilization_percent=70)
+        if provisioned:
+            # AutoScaling of RCUs, never below the configured floor
+            auto_scale(url_mapping_table.auto_scale_read_capacity(
+                min_capacity=ddb_min_read_capacity, max_capacity=ddb_max_capacity
+            ))
 
-        # AutoScaling of WCUs with a Target Utilization of 70%
-        url_mapping_table.auto_scale_write_capacity(
-            min_capacity=10, max_capacity=40000
-        ).scale_on_utilization(target_utilization_percent=70)
+            # AutoScaling of WCUs, never below the configured floor
+            auto_scale(url_mapping_table.auto_scale_write_capacity(
+                min_capacity=ddb_min_write_capacity, max_capacity=ddb_max_capacity
+            ))
 
-        # DDB table to keep track of an Atomic Counter used for generating Short URLs
-        url_counter_table = ddb.Table(
-            self,
-            "url_shortener_counter_table",
-            partition_key=ddb.Attribute(
-                name="id",
-                type=ddb.AttributeType.STRING
-            ),
-            read_capacity=10,
-            write_capacity=10,
-            removal_policy=core.RemovalPolicy.DESTROY,
+        # Environment of the Lambda function along with the DDB tables it needs access to
+        url_lambda_env = dict(
+            proxy_environment(self.node.try_get_context),
+            URL_SHORTENER_MAPPING_TABLE=url_mapping_table.table_name,
         )
+        ddb_table_arns = [url_mapping_table.table_arn]
 
-        # AutoScaling of RCUs with a Target Utilization of 70%
-        url_counter_table.auto_scale_read_capacity(
-            min_capacity=10, max_capacity=40000
-        ).scale_on_utilization(target_utilization_percent=70)
+        if dedupe:
+            # GSI keyed on a digest of the Long URL, used to find the Short URL of an already shortened Long URL
+            url_mapping_table.add_global_secondary_index(
+                index_name="long_url_hash_index",
+                partition_key=ddb.Attribute(
+                    name="long_url_hash",
+                    type=ddb.AttributeType.STRING
+                ),
+                projection_type=ddb.ProjectionType.KEYS_ONLY,
+                **capacity,
+            )
 
-        # AutoScaling of WCUs with a Target Utilization of 70%
-        url_counter_table.auto_scale_write_capacity(
-            min_capacity=10, max_capacity=40000
-        ).scale_on_utilization(target_utilization_percent=70)
+            if provisioned:
+                # AutoScaling of the GSI RCUs, never below the configured floor
+                auto_scale(url_mapping_table.auto_scale_global_secondary_index_read_capacity(
+                    index_name="long_url_hash_index", min_capacity=ddb_min_read_capacity, max_capacity=ddb_max_capacity
+                ))
 
-        # Lambda function with custom code to handle shortening/unshortening logic
-        url_lambda = _lambda.Function(
-            self,
-            "url_shortener_lambda",
-            code=_lambda.Code.asset("lambda_proxy"),
-            handler="lambda_function.lambda_handler",
-            runtime=_lambda.Runtime.PYTHON_3_8,
-            timeout=core.Duration.seconds(10),
-            environment={
-                "BACKOFF": "25",
-                "HASH_DIGEST_SIZE": "8",
-                "MAX_RETRIES": "3",
-                "URL_SHORTENER_MAPPING_TABLE": url_mapping_table.table_name,
-                "URL_SHORTENER_COUNTER_TABLE": url_counter_table.table_name,
-            },
-            log_retention=logs.RetentionDays.ONE_MONTH,
-        )
+                # AutoScaling of the GSI WCUs (every mapping write is also an index write), never below the configured floor
+                auto_scale(url_mapping_table.auto_scale_global_secondary_index_write_capacity(
+                    index_name="long_url_hash_index", min_capacity=ddb_min_write_capacity, max_capacity=ddb_max_capacity
+                ))
 
-        # A Custom IAM Policy statement to grant DDB access to the Lambda function
-        ddb_policy_statement = iam.PolicyStatement(
-            actions=["dynamodb:PutItem", "dynamodb:GetItem", "dynamodb:UpdateItem"],
-            effect=iam.Effect.ALLOW,
-            resources=[url_mapping_table.table_arn, url_counter_table.table_arn],
-        )
+            url_lambda_env["URL_SHORTENER_DEDUPE_INDEX"] = "long_url_hash_index"
+            ddb_table_arns.append(url_mapping_table.table_arn + "/index/*")
+
+        if id_generator == "counter":
+            # DDB table to keep track of an Atomic Counter used for generating Short URLs
+            url_counter_table = ddb.Table(
+                self,
+                "url_shortener_counter_table",
+                partition_key=ddb.Attribute(
+                    name="id",
+                    type=ddb.AttributeType.STRING
+                ),
+                billing_mode=table_billing_mode,
+                read_capacity=10 if provisioned else None,
+                write_capacity=10 if provisioned else None,
+                removal_policy=core.RemovalPolicy.DESTROY,
+            )
+
+            # The counter is only written once per leased block, so it keeps the small default floor
+            if provisioned:
+                # AutoScaling of RCUs with a Target Utilization of 70%
+                url_counter_table.auto_scale_read_capacity(
+                    min_capacity=10, max_capacity=ddb_max_capacity
+                ).scale_on_utilization(target_utilization_percent=70)
+
+                # AutoScaling of WCUs with a Target Utilization of 70%
+                url_counter_table.auto_scale_write_capacity(
+                    min_capacity=10, max_capacity=ddb_max_capacity
+                ).scale_on_utilization(target_utilization_percent=70)
+
+            url_lambda_env["URL_SHORTENER_COUNTER_TABLE"] = url_counter_table.table_name
+            ddb_table_arns.append(url_counter_table.table_arn)
+
+        # Options and environment of the function serving the unshorten API
+        reader_options = {}
+        reader_env = url_lambda_env
+
+        if dax_enabled:
+            # VPC without NAT, DynamoDB is reached through a gateway endpoint and DAX from within the VPC
+            url_vpc = ec2.Vpc(
+                self,
+                "url_shortener_vpc",
+                nat_gateways=0,
+                subnet_configuration=[
+                    ec2.SubnetConfiguration(
+                        name="isolated",
+                        subnet_type=ec2.SubnetType.ISOLATED,
+                    ),
+                ],
+            )
+
+            url_vpc.add_gateway_endpoint(
+                "dynamodb_endpoint",
+                service=ec2.GatewayVpcEndpointAwsService.DYNAMODB,
+            )
+
+            reader_security_group = ec2.SecurityGroup(self, "url_shortener_reader_sg", vpc=url_vpc)
+            dax_security_group = ec2.SecurityGroup(self, "url_shortener_dax_sg", vpc=url_vpc)
+
+            # Only the reader Lambda function can reach the DAX cluster (unencrypted endpoint port)
+            dax_security_group.add_ingress_rule(reader_security_group, ec2.Port.tcp(8111))
+
+            # IAM Role used by DAX to read the mapping table on cache misses
+            dax_role = iam.Role(
+                self,
+                "url_shortener_dax_role",
+                assumed_by=iam.ServicePrincipal("dax.amazonaws.com"),
+            )
+
+            dax_role.add_to_policy(iam.PolicyStatement(
+                actions=["dynamodb:GetItem", "dynamodb:BatchGetItem", "dynamodb:DescribeTable"],
+                effect=iam.Effect.ALLOW,
+                resources=[url_mapping_table.table_arn],
+            ))
+
+            dax_subnet_group = dax.CfnSubnetGroup(
+                self,
+                "url_shortener_dax_subnets",
+                subnet_ids=[subnet.subnet_id for subnet in url_vpc.isolated_subnets],
+            )
+
+            # Mappings never change once written, the item TTL only bounds how long a 404 of a new Short URL is cached
+            dax_parameter_group = dax.CfnParameterGroup(
+                self,
+                "url_shortener_dax_parameters",
+                parameter_name_values={
+                    "record-ttl-millis": str(dax_item_ttl * 1000),
+                    "query-ttl-millis": str(dax_item_ttl * 1000),
+                },
+            )
+
+            dax_cluster = dax.CfnCluster(
+                self,
+                "url_shortener_dax",
+                iam_role_arn=dax_role.role_arn,
+                node_type=dax_node_type,
+                replication_factor=dax_nodes,
+                subnet_group_name=dax_subnet_group.ref,
+                parameter_group_name=dax_parameter_group.ref,
+                security_group_ids=[dax_security_group.security_group_id],
+                sse_specification=dax.CfnCluster.SSESpecificationProperty(sse_enabled=True),
+            )
+
+            reader_options = {
+                "vpc": url_vpc,
+                "vpc_subnets": ec2.SubnetSelection(subnet_type=ec2.SubnetType.ISOLATED),
+                "security_groups": [reader_security_group],
+                "layers": [_lambda.LayerVersion(
+                    self,
+                    "dax_client_layer",
+                    code=_lambda.Code.asset("dax_layer"),
+                    compatible_runtimes=[_lambda.Runtime.PYTHON_3_8],
+                )],
+            }
+            reader_env = dict(url_lambda_env, DAX_ENDPOINT=dax_cluster.attr_cluster_discovery_endpoint)
+
+        if click_analytics:
+            # DDB table of the click counters of every Short URL, spread across "<short_url>#<shard>" partition keys:
+            # "sum#total", "sum#ref#<host>", "sum#geo#<country>" and the "minute#", "hour#" and "day#" buckets
+            url_clicks_table = ddb.Table(
+                self,
+                "url_shortener_clicks_table",
+                partition_key=ddb.Attribute(
+                    name="id",
+                    type=ddb.AttributeType.STRING
+                ),
+                sort_key=ddb.Attribute(
+                    name="counter",
+                    type=ddb.AttributeType.STRING
+                ),
+                billing_mode=table_billing_mode,
+                # Minute and hour buckets expire, DynamoDB deletes them without consuming write capacity
+                time_to_live_attribute="expires_at",
+                removal_policy=core.RemovalPolicy.DESTROY,
+                **capacity,
+            )
+
+            if provisioned:
+                # AutoScaling of the WCUs of the counters, never below the configured floor
+                auto_scale(url_clicks_table.auto_scale_write_capacity(
+                    min_capacity=ddb_min_write_capacity, max_capacity=ddb_max_capacity
+                ))
+
+            # Click batches that keep failing to be rolled up are set aside instead of being retried forever
+            clicks_dead_letter_queue = sqs.Queue(
+                self,
+                "url_shortener_clicks_dlq",
+                retention_period=core.Duration.days(14),
+            )
+
+            # Visibility timeout of 6 times the aggregator timeout, as recommended for Lambda event sources
+            clicks_queue = sqs.Queue(
+                self,
+                "url_shortener_clicks_queue",
+                visibility_timeout=core.Duration.minutes(3),
+                dead_letter_queue=sqs.DeadLetterQueue(
+                    max_receive_count=5,
+                    queue=clicks_dead_letter_queue,
+                ),
+            )
+
+            # Lambda function rolling the queued clicks up into the counters, a batch of SQS messages at a time
+            click_aggregator = _lambda.Function(
+                self,
+                "url_shortener_click_aggregator",
+                code=_lambda.Code.asset("lambda_clicks"),
+                handler="click_aggregator.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                timeout=core.Duration.seconds(30),
+                environment={
+                    "CLICK_SHARDS": str(click_shards),
+                    "URL_SHORTENER_CLICKS_TABLE": url_clicks_table.table_name,
+                    "WRITERS": "8",
+                },
+                log_retention=logs.RetentionDays.ONE_MONTH,
+            )
+
+            click_aggregator.add_event_source(event_sources.SqsEventSource(clicks_queue, batch_size=10))
+
+            click_aggregator.add_to_role_policy(iam.PolicyStatement(
+                actions=["dynamodb:UpdateItem"],
+                effect=iam.Effect.ALLOW,
+                resources=[url_clicks_table.table_arn],
+            ))
+
+            # Lambda function serving the stats API, merging the shards of the counters of a Short URL
+            click_stats = _lambda.Function(
+                self,
+                "url_shortener_click_stats",
+                code=_lambda.Code.asset("lambda_clicks"),
+                handler="click_stats.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                timeout=core.Duration.seconds(10),
+                environment={
+                    "CLICK_SHARDS": str(click_shards),
+                    "URL_SHORTENER_CLICKS_TABLE": url_clicks_table.table_name,
+                },
+                log_retention=logs.RetentionDays.ONE_MONTH,
+            )
+
+            click_stats.add_to_role_policy(iam.PolicyStatement(
+                actions=["dynamodb:Query"],
+                effect=iam.Effect.ALLOW,
+                resources=[url_clicks_table.table_arn],
+            ))
+
+            reader_env = dict(
+                reader_env,
+                CLICKS_QUEUE_URL=clicks_queue.queue_url,
+                CLICK_BATCH_SIZE=str(click_batch_size),
+                CLICK_FLUSH_SECONDS=str(click_flush_seconds),
+                # Redirects served from CloudFront's cache never reach the function, so CloudFront doesn't keep them
+                REDIRECT_S_MAXAGE="0",
+            )
+
+            if dax_enabled:
+                # The reader runs in a VPC without NAT, SQS is reached through an interface endpoint
+                sqs_endpoint = url_vpc.add_interface_endpoint(
+                    "sqs_endpoint",
+                    service=ec2.InterfaceVpcEndpointAwsService.SQS,
+                )
+
+                sqs_endpoint.connections.allow_default_port_from(reader_security_group)
+
+        # Actions needed by the shorten (writer) and unshorten (reader) code respectively
+        writer_actions = [
+            "dynamodb:PutItem",
+            "dynamodb:GetItem",
+            "dynamodb:UpdateItem",
+            "dynamodb:Query",
+        ]
+        reader_actions = [
+            "dynamodb:GetItem",
+            "dynamodb:BatchGetItem",
+        ]
+
+        if split_functions:
+            # Lambda function shortening URLs, write-heavy and tolerant to latency; its bundle leaves out the reader code
+            shorten_lambda = _lambda.Function(
+                self,
+                "url_shortener_shorten_lambda",
+                code=_lambda.Code.from_asset("lambda_proxy", exclude=["lambda_function.py", "unshorten.py", "lru_cache.py", "click_stream.py", "tests", "__pycache__"]),
+                handler="shorten.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                memory_size=shorten_memory_size,
+                timeout=core.Duration.seconds(shorten_timeout),
+                reserved_concurrent_executions=shorten_reserved_concurrency or None,
+                environment=url_lambda_env,
+                log_retention=logs.RetentionDays.ONE_MONTH,
+            )
 
-        # Attaching DDB Policy statement with the Lambda IAM Role
-        url_lambda.add_to_role_policy(ddb_policy_statement)
+            # Lambda function serving the redirects, read-only and latency-critical; its bundle leaves out the writer code
+            unshorten_lambda = _lambda.Function(
+                self,
+                "url_shortener_unshorten_lambda",
+                code=_lambda.Code.from_asset("lambda_proxy", exclude=["lambda_function.py", "shorten.py", "short_codes.py", "tests", "__pycache__"]),
+                handler="unshorten.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                memory_size=unshorten_memory_size,
+                timeout=core.Duration.seconds(unshorten_timeout),
+                reserved_concurrent_executions=unshorten_reserved_concurrency or None,
+                environment=reader_env,
+                log_retention=logs.RetentionDays.ONE_MONTH,
+                **reader_options,
+            )
+
+            # Least privilege: the reader only reads the mapping table
+            shorten_lambda.add_to_role_policy(iam.PolicyStatement(
+                actions=writer_actions,
+                effect=iam.Effect.ALLOW,
+                resources=ddb_table_arns,
+            ))
+
+            unshorten_lambda.add_to_role_policy(iam.PolicyStatement(
+                actions=reader_actions,
+                effect=iam.Effect.ALLOW,
+                resources=[url_mapping_table.table_arn],
+            ))
+
+        else:
+            # Lambda function with custom code to handle shortening/unshortening logic
+            url_lambda = _lambda.Function(
+                self,
+                "url_shortener_lambda",
+                code=_lambda.Code.from_asset("lambda_proxy", exclude=["tests", "__pycache__"]),
+                handler="lambda_function.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                timeout=core.Duration.seconds(10),
+                environment=reader_env,
+                log_retention=logs.RetentionDays.ONE_MONTH,
+                **reader_options,
+            )
+
+            # A Custom IAM Policy statement to grant DDB access to the Lambda function
+            ddb_policy_statement = iam.PolicyStatement(
+                actions=writer_actions + ["dynamodb:BatchGetItem"],
+                effect=iam.Effect.ALLOW,
+                resources=ddb_table_arns,
+            )
+
+            # Attaching DDB Policy statement with the Lambda IAM Role
+            url_lambda.add_to_role_policy(ddb_policy_statement)
+
+            shorten_lambda = unshorten_lambda = url_lambda
+
+        if click_analytics:
+            # The unshorten code only sends the clicks to the queue
+            clicks_queue.grant_send_messages(unshorten_lambda)
+
+        if dax_enabled:
+            # Reads of the mapping table through the DAX cluster
+            unshorten_lambda.add_to_role_policy(iam.PolicyStatement(
+                actions=["dax:GetItem", "dax:BatchGetItem"],
+                effect=iam.Effect.ALLOW,
+                resources=[dax_cluster.attr_arn],
+            ))
+
+        # APIs invoke the Lambda functions directly, or the unshorten alias when provisioned concurrency is enabled
+        shorten_handler = shorten_lambda
+        unshorten_handler = unshorten_lambda
+
+        if provisioned_concurrency > 0:
+            # Alias with provisioned concurrency, so that redirects land on containers initialized ahead of time
+            unshorten_handler = _lambda.Alias(
+                self,
+                "url_shortener_lambda_live",
+                alias_name="live",
+                version=unshorten_lambda.current_version,
+                provisioned_concurrent_executions=provisioned_concurrency,
+            )
+
+            # The single function deployment serves both APIs from the alias
+            if not split_functions:
+                shorten_handler = unshorten_handler
+
+            if provisioned_concurrency_max > provisioned_concurrency:
+                # AutoScaling of the provisioned concurrency of the alias on its utilization (Alias has no
+                # add_auto_scaling in this CDK version, the scalable target is declared as such)
+                pc_scaling = appscaling.ScalableTarget(
+                    self,
+                    "url_shortener_lambda_live_scaling",
+                    service_namespace=appscaling.ServiceNamespace.LAMBDA,
+                    scalable_dimension="lambda:function:ProvisionedConcurrency",
+                    resource_id=f"function:{unshorten_lambda.function_name}:{unshorten_handler.alias_name}",
+                    min_capacity=provisioned_concurrency,
+                    max_capacity=provisioned_concurrency_max,
+                )
+
+                # The alias (and its provisioned concurrency) must exist before it's registered as a scalable target
+                pc_scaling.node.add_dependency(unshorten_handler)
+
+                pc_scaling.scale_to_track_metric(
+                    "url_shortener_lambda_live_utilization",
+                    predefined_metric=appscaling.PredefinedMetric.LAMBDA_PROVISIONED_CONCURRENCY_UTILIZATION,
+                    target_value=provisioned_concurrency_utilization,
+                )
+
+                # Scheduled scaling ahead of known traffic peaks (ex: {"name": "launch", "expression": "cron(0 8 * * ? *)", "min_capacity": 50})
+                for schedule in provisioned_concurrency_schedules:
+                    pc_scaling.scale_on_schedule(
+                        schedule["name"],
+                        schedule=appscaling.Schedule.expression(schedule["expression"]),
+                        min_capacity=schedule.get("min_capacity"),
+                        max_capacity=schedule.get("max_capacity"),
+                    )
 
         # Including X-Requested-With to the default CORS headers list
         headers = apigw.Cors.DEFAULT_HEADERS
         headers.append('X-Requested-With')
 
-        # API Gateway endpoint to serve Shorten/Unshorten APIs
-        url_rest_api = apigw.RestApi(
-            self,
-            "url_shortener_API",
-            default_cors_preflight_options=apigw.CorsOptions(
-                allow_origins=apigw.Cors.ALL_ORIGINS,
-                allow_headers=headers,
-                allow_methods=["POST", "GET", "OPTIONS"],
-                status_code=200,
-            ),
-        )
+        if api_type == "http":
+            # HTTP API endpoint to serve Shorten/Unshorten APIs, lighter than a REST API
+            url_http_api = apigwv2.HttpApi(
+                self,
+                "url_shortener_HTTP_API",
+                cors_preflight=apigwv2.CorsPreflightOptions(
+                    allow_origins=["*"],
+                    allow_headers=headers,
+                    allow_methods=[apigwv2.HttpMethod.POST, apigwv2.HttpMethod.GET, apigwv2.HttpMethod.OPTIONS],
+                ),
+            )
 
-        # Shorten API using POST and Lambda proxy
-        url_rest_api.root.add_resource(
-            path_part="shorten",
-        ).add_method(
-            http_method="POST",
-            request_models={
-                "application/json": apigw.Model.EMPTY_MODEL,
-            },
-            integration=apigw.LambdaIntegration(
-                handler=url_lambda,
-                proxy=True,
-                allow_test_invoke=True,
-            ),
-        )
+            # Lambda proxy integrations using the lighter payload format 2.0
+            shorten_integration = apigwv2.LambdaProxyIntegration(
+                handler=shorten_handler,
+                payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0,
+            )
 
-        # Unshorten API using GET and Lambda proxy
-        url_rest_api.root.add_resource(
-            path_part="unshorten",
-        ).add_resource(
-            path_part="{shorturl}"
-        ).add_method(
-            http_method="GET",
-            request_models={
-                "application/json": apigw.Model.EMPTY_MODEL,
-            },
-            integration=apigw.LambdaIntegration(
-                handler=url_lambda,
-                proxy=True,
-                allow_test_invoke=True,
-            ),
-        )
+            unshorten_integration = apigwv2.LambdaProxyIntegration(
+                handler=unshorten_handler,
+                payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0,
+            )
+
+            # Shorten, Batch Shorten, Unshorten and Batch Unshorten routes, and the Stats route with click analytics
+            routes = [
+                ("/shorten", apigwv2.HttpMethod.POST, shorten_integration),
+                ("/shorten/batch", apigwv2.HttpMethod.POST, shorten_integration),
+                ("/unshorten/{shorturl}", apigwv2.HttpMethod.GET, unshorten_integration),
+                ("/unshorten/batch", apigwv2.HttpMethod.POST, unshorten_integration),
+            ]
+
+            if click_analytics:
+                routes.append(("/stats/{shorturl}", apigwv2.HttpMethod.GET, apigwv2.LambdaProxyIntegration(
+                    handler=click_stats,
+                    payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0,
+                )))
+
+            for path, method, integration in routes:
+                url_http_api.add_routes(
+                    path=path,
+                    methods=[method],
+                    integration=integration,
+                )
+
+            # HTTP APIs are served from their $default stage, without a stage name in the path
+            api_url = url_http_api.url
+            api_origin_path = "/unshorten"
+
+        else:
+            # API Gateway endpoint to serve Shorten/Unshorten APIs
+            url_rest_api = apigw.RestApi(
+                self,
+                "url_shortener_API",
+                default_cors_preflight_options=apigw.CorsOptions(
+                    allow_origins=apigw.Cors.ALL_ORIGINS,
+                    allow_headers=headers,
+                    allow_methods=["POST", "GET", "OPTIONS"],
+                    status_code=200,
+                ),
+                # An edge-optimized API sits behind a CloudFront distribution of its own, which would replace the viewer's
+                # CloudFront-Viewer-Country with the country of the outer distribution's POP
+                endpoint_types=[apigw.EndpointType.REGIONAL] if click_analytics else None,
+            )
+
+            # Shorten API using POST and Lambda proxy
+            shorten_resource = url_rest_api.root.add_resource(
+                path_part="shorten",
+            )
+
+            shorten_resource.add_method(
+                http_method="POST",
+                request_models={
+                    "application/json": apigw.Model.EMPTY_MODEL,
+                },
+                integration=apigw.LambdaIntegration(
+                    handler=shorten_handler,
+                    proxy=True,
+                    allow_test_invoke=True,
+                ),
+            )
+
+            # Batch Shorten API using POST and Lambda proxy
+            shorten_resource.add_resource(
+                path_part="batch",
+            ).add_method(
+                http_method="POST",
+                request_models={
+                    "application/json": apigw.Model.EMPTY_MODEL,
+                },
+                integration=apigw.LambdaIntegration(
+                    handler=shorten_handler,
+                    proxy=True,
+                    allow_test_invoke=True,
+                ),
+            )
+
+            # Unshorten API using GET and Lambda proxy
+            unshorten_resource = url_rest_api.root.add_resource(
+                path_part="unshorten",
+            )
+
+            unshorten_resource.add_resource(
+                path_part="{shorturl}"
+            ).add_method(
+                http_method="GET",
+                request_models={
+                    "application/json": apigw.Model.EMPTY_MODEL,
+                },
+                integration=apigw.LambdaIntegration(
+                    handler=unshorten_handler,
+                    proxy=True,
+                    allow_test_invoke=True,
+                ),
+            )
+
+            # Batch Unshorten API using POST and Lambda proxy
+            unshorten_resource.add_resource(
+                path_part="batch",
+            ).add_method(
+                http_method="POST",
+                request_models={
+                    "application/json": apigw.Model.EMPTY_MODEL,
+                },
+                integration=apigw.LambdaIntegration(
+                    handler=unshorten_handler,
+                    proxy=True,
+                    allow_test_invoke=True,
+                ),
+            )
+
+            if click_analytics:
+                # Stats API using GET and Lambda proxy
+                url_rest_api.root.add_resource(
+                    path_part="stats",
+                ).add_resource(
+                    path_part="{shorturl}"
+                ).add_method(
+                    http_method="GET",
+                    integration=apigw.LambdaIntegration(
+                        handler=click_stats,
+                        proxy=True,
+                        allow_test_invoke=True,
+                    ),
+                )
+
+            api_url = url_rest_api.url
+            api_origin_path = "/" + url_rest_api.deployment_stage.stage_name + "/unshorten"
 
         # S3 bucket to host the URL Shortener Static Website
         s3_web_hosting = s3.Bucket(
@@ -181,7 +765,7 @@ class AwsUrlShortenerStack(core.Stack):
             properties={
                 "S3_BUCKET": s3_web_hosting.bucket_name,
                 "S3_KEY": "index.html",
-                "POST_URL": url_rest_api.url + "shorten",
+                "POST_URL": api_url + "shorten",
             },
             removal_policy=core.RemovalPolicy.DESTROY,
         )
@@ -189,6 +773,149 @@ class AwsUrlShortenerStack(core.Stack):
         # Adding dependency so that Custom Resource creation happens after files are uploaded to S3
         lambda_cr.node.add_dependency(s3_deploy)
 
+        # Static files served from the S3 origin
+        s3_behaviors = [
+            cf.Behavior(
+                is_default_behavior=False,
+                path_pattern="/index.html",
+            ),
+            cf.Behavior(
+                is_default_behavior=False,
+                path_pattern="/favicon.ico",
+            ),
+        ]
+        edge_associations = []
+        api_origin_headers = None
+        edge_logging = None
+
+        if edge_tier:
+            # IAM Role that can be assumed by both Lambda and Lambda@Edge
+            edge_role = iam.Role(
+                self,
+                "url_shortener_edge_role",
+                assumed_by=iam.CompositePrincipal(
+                    iam.ServicePrincipal("lambda.amazonaws.com"),
+                    iam.ServicePrincipal("edgelambda.amazonaws.com"),
+                ),
+                managed_policies=[
+                    iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSLambdaBasicExecutionRole"),
+                ],
+            )
+
+            # Lambda@Edge function answering the redirects of the hot-set Short URLs on CloudFront cache misses
+            edge_lambda = _lambda.Function(
+                self,
+                "url_shortener_edge",
+                code=_lambda.Code.asset("lambda_edge"),
+                handler="edge_function.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                memory_size=128,
+                timeout=core.Duration.seconds(5),
+                role=edge_role,
+            )
+
+            edge_associations.append(cf.LambdaFunctionAssociation(
+                event_type=cf.LambdaEdgeEventType.ORIGIN_REQUEST,
+                lambda_function=edge_lambda.current_version,
+            ))
+
+            # The hot-set is published to the S3 bucket and read by the edge function with its role, never through
+            # the distribution; Lambda@Edge can't have environment variables, so its location is passed in custom
+            # headers added to the requests to the API origin, which the ORIGIN_REQUEST event carries
+            hotset_key = "edge/hotset.json"
+
+            edge_role.add_to_policy(iam.PolicyStatement(
+                actions=["s3:GetObject"],
+                effect=iam.Effect.ALLOW,
+                resources=[s3_web_hosting.bucket_arn + "/" + hotset_key],
+            ))
+
+            api_origin_headers = {
+                "x-hotset-bucket": s3_web_hosting.bucket_name,
+                "x-hotset-key": hotset_key,
+                "x-hotset-region": self.region,
+            }
+
+            # The distribution's standard logs, which the hot-set is ranked on: unlike the Lambda logs, they include the
+            # redirects answered by CloudFront's cache and by the edge function
+            edge_log_bucket = s3.Bucket(
+                self,
+                "url_shortener_edge_log_bucket",
+                block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                lifecycle_rules=[s3.LifecycleRule(expiration=core.Duration.days(2))],
+            )
+
+            edge_logging = cf.LoggingConfiguration(bucket=edge_log_bucket, prefix="cloudfront/", include_cookies=False)
+
+            # Scores of the ranked Short URLs, carried over from one build to the next
+            hotset_state_key = "edge/hotset_state.json"
+
+            # Lambda function to rebuild the hot-set from the most requested Short URLs in the distribution's logs,
+            # one build at a time as every build carries over the scores of the previous one
+            hotset_builder = _lambda.Function(
+                self,
+                "url_shortener_hotset_builder",
+                # url_codec.py is copied from the proxy Lambda code, so that both decode the mapping items alike
+                code=_lambda.Code.from_asset(staged_asset(
+                    "lambda_hotset",
+                    os.path.join("lambda_hotset", "hotset_builder.py"),
+                    os.path.join("lambda_proxy", "url_codec.py"),
+                )),
+                handler="hotset_builder.lambda_handler",
+                runtime=_lambda.Runtime.PYTHON_3_8,
+                memory_size=1024,
+                timeout=core.Duration.minutes(edge_refresh_minutes),
+                reserved_concurrent_executions=1,
+                environment={
+                    "HALF_LIFE_MINUTES": str(edge_refresh_minutes * 12),
+                    "HOTSET_BUCKET": s3_web_hosting.bucket_name,
+                    "HOTSET_KEY": hotset_key,
+                    "HOTSET_SIZE": str(edge_hotset_size),
+                    "LOG_BUCKET": edge_log_bucket.bucket_name,
+                    "LOG_PREFIX": edge_logging.prefix,
+                    "REDIRECT_MAX_AGE": str(redirect_browser_ttl),
+                    "REDIRECT_S_MAXAGE": str(redirect_cache_ttl),
+                    "STATE_KEY": hotset_state_key,
+                    "URL_SHORTENER_MAPPING_TABLE": url_mapping_table.table_name,
+                },
+                log_retention=logs.RetentionDays.ONE_MONTH,
+            )
+
+            edge_log_bucket.grant_read(hotset_builder)
+
+            hotset_builder.add_to_role_policy(iam.PolicyStatement(
+                actions=["dynamodb:BatchGetItem"],
+                effect=iam.Effect.ALLOW,
+                resources=[url_mapping_table.table_arn],
+            ))
+
+            hotset_builder.add_to_role_policy(iam.PolicyStatement(
+                actions=["s3:PutObject"],
+                effect=iam.Effect.ALLOW,
+                resources=[s3_web_hosting.bucket_arn + "/" + hotset_key, s3_web_hosting.bucket_arn + "/" + hotset_state_key],
+            ))
+
+            hotset_builder.add_to_role_policy(iam.PolicyStatement(
+                actions=["s3:GetObject"],
+                effect=iam.Effect.ALLOW,
+                resources=[s3_web_hosting.bucket_arn + "/" + hotset_state_key],
+            ))
+
+            # Without it, S3 answers AccessDenied instead of NoSuchKey before the first state is published
+            hotset_builder.add_to_role_policy(iam.PolicyStatement(
+                actions=["s3:ListBucket"],
+                effect=iam.Effect.ALLOW,
+                resources=[s3_web_hosting.bucket_arn],
+            ))
+
+            # Rebuilding the hot-set periodically
+            events.Rule(
+                self,
+                "url_shortener_hotset_schedule",
+                schedule=events.Schedule.rate(core.Duration.minutes(edge_refresh_minutes)),
+                targets=[targets.LambdaFunction(hotset_builder)],
+            )
+
         # CloudFront Distribution with S3 and APIGateway origins
         url_cf_distribution = cf.CloudFrontWebDistribution(
             self,
@@ -203,34 +930,48 @@ class AwsUrlShortenerStack(core.Stack):
                             comment="OAI that allows CloudFront to access the S3 bucket"
                         ),
                     ),
-                    behaviors=[
-                        cf.Behavior(
-                            is_default_behavior=False,
-                            path_pattern="/index.html",
-                        ),
-                        cf.Behavior(
-                            is_default_behavior=False,
-                            path_pattern="/favicon.ico",
-                        ),
-                    ]
+                    behaviors=s3_behaviors,
                 ),
                 cf.SourceConfiguration(
                     custom_origin_source=cf.CustomOriginConfig(
-                        domain_name=url_rest_api.url.lstrip("https://").split("/")[0],
+                        domain_name=api_url.lstrip("https://").split("/")[0],
                     ),
-                    origin_path="/" + url_rest_api.deployment_stage.stage_name + "/unshorten",
+                    origin_path=api_origin_path,
+                    origin_headers=api_origin_headers,
                     behaviors=[
+                        # Redirects are cached as per their Cache-Control header (s-maxage), anything without one isn't
                         cf.Behavior(
                             is_default_behavior=True,
                             allowed_methods=cf.CloudFrontAllowedMethods.GET_HEAD_OPTIONS,
+                            min_ttl=core.Duration.seconds(0),
+                            default_ttl=core.Duration.seconds(0),
+                            max_ttl=core.Duration.seconds(redirect_cache_ttl),
+                            lambda_function_associations=edge_associations,
+                            # The viewer's country is only added to the origin requests when whitelisted (for the click counts)
+                            forwarded_values=cf.CfnDistribution.ForwardedValuesProperty(
+                                query_string=False,
+                                headers=["CloudFront-Viewer-Country"],
+                            ) if click_analytics else None,
                         )
                     ]
                 )
             ],
+            # Unknown Short URLs are cached for a much shorter time than redirects
+            error_configurations=[
+                cf.CfnDistribution.CustomErrorResponseProperty(
+                    error_code=404,
+                    error_caching_min_ttl=not_found_cache_ttl,
+                ),
+            ],
             price_class=cf.PriceClass.PRICE_CLASS_ALL,
             default_root_object="index.html",
+            logging_config=edge_logging,
         )
 
+        if edge_tier:
+            # The log file keys start with the distribution ID
+            hotset_builder.add_environment("DISTRIBUTION_ID", url_cf_distribution.distribution_id)
+
         # Adding the CloudFront Distribution endpoint to CFN Output
         core.CfnOutput(
             self,
@@ -0,0 +1,49 @@
+# Environment of the proxy Lambda function(s), the names of the deployed resources aside; kept free of any CDK import
+# so that the benchmarks (bench/bench_load.py) run the Lambda function locally with the configuration of the stack
+
+
+def proxy_environment(context):
+    '''
+    Environment variables of the proxy Lambda function for the given context values, context being a function
+    returning the value of a context key or None: the stack's node.try_get_context, or the get of cdk.json's context;
+    '''
+    id_generator = context("id_generator") or "counter"
+    dedupe = str(context("dedupe")).lower() == "true"
+
+    environment = {
+        "BACKOFF": "25",
+        "BATCH_MAX_URLS": "500",
+        "CACHE_NEGATIVE_TTL": "5",
+        "CACHE_SIZE": "10000",
+        "CACHE_TTL": "300",
+        "CODE_ALPHABET": context("code_alphabet") or "hex",
+        "CODE_LENGTH": str(int(context("code_length") or 0)),
+        "DDB_CONNECT_TIMEOUT": "1",
+        "DDB_MAX_POOL_CONNECTIONS": "10",
+        "DDB_READ_TIMEOUT": "2",
+        "DDB_TCP_KEEPALIVE": "true",
+        "DEDUPE": str(dedupe).lower(),
+        "HASH_DIGEST_SIZE": "8",
+        "ID_GENERATOR": id_generator,
+        "MAX_BACKOFF": "1000",
+        "MAX_RETRIES": "3",
+        "METRICS_NAMESPACE": "UrlShortener",
+        "NOT_FOUND_MAX_AGE": str(int(context("not_found_cache_ttl") or 0)),
+        "REDIRECT_MAX_AGE": str(int(context("redirect_browser_ttl") or 0)),
+        "REDIRECT_S_MAXAGE": str(int(context("redirect_cache_ttl") or 0)),
+        "RETRY_BUDGET": "500",
+        # Storage of the Long URLs: "plain" strings, or "zlib"/"zstd" compressed binaries against a preset URL dictionary
+        "URL_ENCODING": context("url_encoding") or "plain",
+        "WARM_UP_ON_INIT": "true",
+    }
+
+    if id_generator == "counter":
+        # Counter values are leased in blocks, from the counter item or one of its shards picked per container
+        environment.update({
+            "COUNTER_BLOCK_SIZE": "1000",
+            # Number of items the atomic counter is spread across (1 keeps the single "counter" item)
+            "COUNTER_SHARDS": str(int(context("counter_shards") or 1)),
+            "COUNTER_SHARD_SELECTION": "container",
+        })
+
+    return environment
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+''' 
+Runs the bulk import tool (tools/bulk_import.py) against an in-memory DynamoDB stand-in: import throughput at the
+given WCU target and worker count, then an import interrupted by a DynamoDB outage and resumed from its checkpoint;
+
+    $ python bench/bench_bulk_import.py --rows 20000 --workers 8 --wcu 5000 --latency-ms 5
+'''
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from bench_common import BENCH_DIR
+from bench_encoding import sample_corpus
+from fake_ddb import FakeClientError, FakeDynamoDB
+
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "tools"))
+
+import bulk_import  # noqa: E402
+
+TABLE = "url_shortener_mapping_table"
+
+
+class FailingDynamoDB(FakeDynamoDB):
+    # Stand-in whose BatchWriteItem calls fail for good after a number of calls, like an import stopped halfway
+    def __init__(self, fail_after, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_after = fail_after
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        if self.calls.get('batch_write_item', 0) >= self.fail_after:
+            raise FakeClientError('InternalServerError', "Simulated outage")
+
+        return super().batch_write_item(RequestItems, **kwargs)
+
+
+def write_input(directory, rows):
+    path = os.path.join(directory, "mappings.csv")
+
+    with open(path, "w") as fp:
+        fp.write("short_url,long_url\n")
+        for i, long_url in enumerate(sample_corpus(rows)):
+            fp.write(f"legacy{i},{long_url}\n")
+
+        # A few rows the import must reject
+        fp.write("not a code!,https://example.com\nlegacy-x,ftp://example.com\nonly-one-column\n")
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="mappings to import")
+    parser.add_argument("--workers", type=int, default=8, help="parallel BatchWriteItem workers")
+    parser.add_argument("--wcu", type=float, default=5000, help="target write capacity units per second")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated DynamoDB round trip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_input(directory, args.rows)
+        argv = [path, "--table", TABLE, "--workers", str(args.workers), "--wcu", str(args.wcu), "--max-retries", "2"]
+
+        fake = FakeDynamoDB(latency=args.latency_ms / 1000)
+        start = perf_counter()
+        stats = bulk_import.main(argv + ["--checkpoint", os.path.join(directory, "full.checkpoint")], client=fake)
+        elapsed = perf_counter() - start
+
+        assert len(fake.tables[TABLE]) == args.rows and stats["rejected"] == 3, stats
+        print(f"full import: {args.rows / elapsed:.0f} items/s, {fake.calls['batch_write_item']} BatchWriteItem calls")
+
+        # Interrupted import, resumed with a healthy DynamoDB from the same checkpoint
+        checkpoint = ["--checkpoint", os.path.join(directory, "resumed.checkpoint")]
+        failing = FailingDynamoDB(fail_after=args.rows // 25 // 2, latency=args.latency_ms / 1000)
+
+        try:
+            bulk_import.main(argv + checkpoint, client=failing)
+        except RuntimeError as e:
+            print(f"interrupted import: {e}, {len(failing.tables[TABLE])} items written")
+
+        resumed = FakeDynamoDB(latency=args.latency_ms / 1000)
+        resumed.tables = failing.tables
+        bulk_import.main(argv + checkpoint, client=resumed)
+
+        assert len(resumed.tables[TABLE]) == args.rows
+        print(f"resumed import: {resumed.calls['batch_write_item']} more BatchWriteItem calls, all {args.rows} items written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+'''
+Measures the cost of click analytics on the redirect path, against in-memory DynamoDB and SQS stand-ins: redirects
+without analytics, with the clicks queued per container and sent to SQS in the background, and with a synchronous
+DynamoDB increment per redirect (the approach the queue avoids). The queued clicks are then rolled up by the click
+aggregator Lambda function, fed with the SQS events the stand-in queue hands out, into a single shard and into
+--shards shards (reporting the writes of the hottest partition key), and the counts merged by the stats API are checked;
+
+    $ python bench/bench_clicks.py --requests 20000 --codes 1000 --ddb-latency-ms 5 --sqs-latency-ms 10 --shards 4
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+from collections import Counter
+from time import perf_counter, sleep
+
+from bench_common import BENCH_DIR, load_lambda, percentile, use_ddb
+from fake_ddb import FakeDynamoDB
+from fake_sqs import FakeSQS
+
+unshorten = load_lambda("unshorten")
+from click_stream import ClickStream  # noqa: E402
+
+os.environ.setdefault("URL_SHORTENER_CLICKS_TABLE", "url_shortener_clicks_table")
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda_clicks"))
+import click_aggregator  # noqa: E402
+import click_stats  # noqa: E402
+
+REFERRERS = ["https://t.co/abc", "https://www.facebook.com/", "https://news.ycombinator.com/item?id=1", None]
+COUNTRIES = ["US", "FR", "IN", "BR", "JP"]
+
+
+class SynchronousClicks:
+    # Counts every click with a DynamoDB increment on the redirect path
+    def __init__(self, client):
+        self.client = client
+
+    def record(self, short_url, headers):
+        self.client.update_item(
+            TableName="url_shortener_clicks_table",
+            Key={"id": {"S": f"{short_url}#0"}, "counter": {"S": "sum#total"}},
+            UpdateExpression="ADD clicks :q",
+            ExpressionAttributeValues={":q": {"N": "1"}},
+        )
+
+
+def workload(requests, codes, seed=42):
+    # Zipf-like popularity of the Short URLs, with a referrer and a country per click
+    rng = random.Random(seed)
+    working_set = [f"c{i:08d}" for i in range(codes)]
+    picks = rng.choices(working_set, weights=[1 / (rank + 1) for rank in range(codes)], k=requests)
+
+    return working_set, [
+        (short_url, {"referer": rng.choice(REFERRERS) or "", "cloudfront-viewer-country": rng.choice(COUNTRIES)})
+        for short_url in picks
+    ]
+
+
+def run(mode, working_set, clicks, ddb_latency, sqs):
+    fake = FakeDynamoDB(latency=ddb_latency)
+    for short_url in working_set:
+        fake.put_item(TableName=unshorten.settings.mapping_table, Item={"short_url": {"S": short_url}, "long_url": {"S": f"https://example.com/{short_url}"}})
+    use_ddb(fake)
+
+    # Warm containers serve most redirects from their cache, so the click is the only DynamoDB call left
+    unshorten.url_cache = unshorten.LRUCache(len(working_set), 300, 5)
+
+    if mode == "queued":
+        unshorten.click_stream = ClickStream("https://sqs.us-east-1.amazonaws.com/123456789012/clicks", lambda: sqs, 100, 10)
+    elif mode == "synchronous":
+        unshorten.click_stream = SynchronousClicks(fake)
+    else:
+        unshorten.click_stream = None
+
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for short_url, headers in clicks:
+            start = perf_counter()
+            result = unshorten.unshorten(short_url, headers)
+            samples.append((perf_counter() - start) * 1000)
+
+            assert result["statusCode"] == "301", result
+
+    if mode == "queued":
+        unshorten.click_stream.flush()
+
+    samples.sort()
+    return samples
+
+
+class CountingDynamoDB(FakeDynamoDB):
+    # Counts the writes per partition key, the hottest one being what DynamoDB's per-partition limits apply to
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.writes = Counter()
+
+    def update_item(self, TableName, Key, **kwargs):
+        with self.lock:
+            self.writes[Key["id"]["S"]] += 1
+
+        return super().update_item(TableName=TableName, Key=Key, **kwargs)
+
+
+def drain(sqs, requests):
+    # Waits for the background thread to send every click, then hands them out as the SQS event source would
+    for _ in range(1000):
+        if sum(len(json.loads(body)) for body in sqs.messages) >= requests:
+            break
+        sleep(0.01)
+
+    return list(sqs.events())
+
+
+def aggregate(events, shards, ddb_latency):
+    fake = CountingDynamoDB(latency=ddb_latency)
+    click_aggregator.ddb = click_stats.ddb = fake
+    click_aggregator.SHARDS = click_stats.SHARDS = shards
+
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for event in events:
+            click_aggregator.lambda_handler(event, None)
+    elapsed = perf_counter() - start
+
+    return fake, elapsed
+
+
+def stats(short_url):
+    response = click_stats.lambda_handler({"pathParameters": {"shorturl": short_url}, "queryStringParameters": {"granularity": "minute"}}, None)
+
+    return json.loads(response["body"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="redirects per mode")
+    parser.add_argument("--codes", type=int, default=1000, help="Short URLs of the working set")
+    parser.add_argument("--ddb-latency-ms", type=float, default=5.0, help="simulated DynamoDB round trip")
+    parser.add_argument("--sqs-latency-ms", type=float, default=10.0, help="simulated SQS round trip")
+    parser.add_argument("--shards", type=int, default=4, help="CLICK_SHARDS compared with a single shard")
+    args = parser.parse_args()
+
+    working_set, clicks = workload(args.requests, args.codes)
+    sqs = FakeSQS(latency=args.sqs_latency_ms / 1000)
+
+    print(f"{'mode':<16}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in ("off", "queued", "synchronous"):
+        samples = run(mode, working_set, clicks, args.ddb_latency_ms / 1000, sqs)
+        print(f"{mode:<16}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}")
+
+    events = drain(sqs, args.requests)
+    expected = Counter(short_url for short_url, _ in clicks)
+    top_url, top_clicks = expected.most_common(1)[0]
+
+    print(f"\n{args.requests} clicks in {sqs.calls} SendMessageBatch calls, rolled up by {len(events)} aggregator invocations\n")
+    print(f"{'shards':<8}{'UpdateItem':>12}{'seconds':>10}{'hottest key writes':>20}{'top Short URL clicks':>22}")
+
+    for shards in sorted({1, args.shards}):
+        fake, elapsed = aggregate(events, shards, args.ddb_latency_ms / 1000)
+        top = stats(top_url)
+
+        print(f"{shards:<8}{fake.calls.get('update_item', 0):>12}{elapsed:>10.2f}{max(fake.writes.values()):>20}{top['total']:>22}")
+
+        # The merged shards add up to the clicks served, in total and over the minute series
+        assert top["total"] == top_clicks == sum(top["series"].values()), top
+        totals = [item for (_, name), item in fake.tables[click_aggregator.CLICKS_TABLE].items() if name == "sum#total"]
+        assert sum(int(item["clicks"]["N"]) for item in totals) == args.requests, "clicks were lost"
+
+
+if __name__ == "__main__":
+    main()
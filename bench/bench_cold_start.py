@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+''' 
+Measures the cold start of the proxy Lambda function: module import time (using "python -X importtime")
+and the first vs. second invocation time, each in a fresh interpreter, against an in-memory DynamoDB stand-in;
+--handler picks the entry point: the single function (lambda_function) or either of the split functions;
+
+    $ python bench/bench_cold_start.py --runs 10 --handler unshorten
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from bench_common import BENCH_DIR, ENVIRONMENT, LAMBDA_DIR
+
+# Runs in a fresh interpreter; the DynamoDB client is swapped for the stand-in right after the import
+SNIPPET = """
+import json
+from time import perf_counter
+start = perf_counter()
+import HANDLER as handler
+imported = perf_counter()
+import common
+from fake_ddb import FakeDynamoDB
+common.ddb = FakeDynamoDB()
+event = json.load(open('EVENT_PATH'))
+first = perf_counter()
+handler.lambda_handler(event, None)
+second = perf_counter()
+handler.lambda_handler(event, None)
+done = perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_ms': (second - first) * 1000, 'second_ms': (done - second) * 1000}))
+"""
+
+
+# Sample event replayed against each entry point
+EVENTS = {
+    "lambda_function": "rest_v1_unshorten.json",
+    "shorten": "rest_v1_shorten.json",
+    "unshorten": "rest_v1_unshorten.json",
+}
+
+
+def run_once(handler):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([LAMBDA_DIR, BENCH_DIR, os.environ.get("PYTHONPATH", "")]), **ENVIRONMENT)
+    snippet = SNIPPET.replace("EVENT_PATH", os.path.join(BENCH_DIR, "events", EVENTS[handler])).replace("HANDLER", handler)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", snippet], env=env, capture_output=True, text=True, check=True)
+
+    # "import time: self [us] | cumulative | imported package", nested imports are indented
+    imports = []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            imports.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return json.loads(proc.stdout.strip().splitlines()[-1]), imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    parser.add_argument("--handler", choices=sorted(EVENTS), default="lambda_function", help="entry point to measure")
+    args = parser.parse_args()
+
+    timings, imports = [], []
+    for _ in range(args.runs):
+        timing, imports = run_once(args.handler)
+        timings.append(timing)
+
+    print(f"{'phase':<24}{'median ms':>12}{'max ms':>12}")
+    for phase in ("import_ms", "first_ms", "second_ms"):
+        samples = [timing[phase] for timing in timings]
+        print(f"{phase[:-3]:<24}{statistics.median(samples):>12.2f}{max(samples):>12.2f}")
+
+    print("\nHeaviest imports of the last run (cumulative):")
+    for name, _, cumulative_us in sorted(imports, key=lambda i: i[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:>8.2f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import importlib
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+LAMBDA_DIR = os.path.join(ROOT_DIR, "lambda_proxy")
+
+# Environment the proxy Lambda function is imported with, unless already set
+ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "MAX_RETRIES": "3",
+    "BACKOFF": "25",
+    "HASH_DIGEST_SIZE": "8",
+    "URL_SHORTENER_MAPPING_TABLE": "url_shortener_mapping_table",
+    "URL_SHORTENER_COUNTER_TABLE": "url_shortener_counter_table",
+}
+
+
+def load_lambda(module="lambda_function"):
+    ''' 
+    Import the given module of the proxy Lambda function with the benchmark environment;
+    its DynamoDB client is meant to be swapped for a FakeDynamoDB by the caller (use_ddb);
+    '''
+    for name, value in ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+
+    return importlib.import_module(module)
+
+
+def stack_environment():
+    ''' 
+    Environment the stack deploys the proxy Lambda function with, for the context values of cdk.json
+    (the names of the deployed resources aside), so that a benchmark runs production-shaped containers;
+    '''
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    from aws_url_shortener.lambda_environment import proxy_environment
+
+    with open(os.path.join(ROOT_DIR, "cdk.json")) as fp:
+        return proxy_environment(json.load(fp)["context"].get)
+
+
+def use_ddb(client, reader=None):
+    # Swap the DynamoDB client shared by the shorten and unshorten code, and optionally the (DAX) reader client
+    import common
+
+    common.ddb = client
+    common.ddb_reader = reader or client
+
+
+def configure(**overrides):
+    # Override settings in every module of the Lambda function, as each holds its own reference to them
+    import common
+    import shorten
+    import unshorten
+
+    settings = common.settings._replace(**overrides)
+    for module in (common, shorten, unshorten):
+        module.settings = settings
+
+
+def percentile(samples, pct):
+    # Nearest-rank percentile of already sorted samples
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+'''
+Compares the Long URL encodings (URL_ENCODING) on a URL corpus: mapping item size, write/read units per item
+and encode/decode time; the corpus is either a file with one URL per line or a generated sample of tracking URLs;
+
+    $ python bench/bench_encoding.py --urls 5000
+    $ python bench/bench_encoding.py --corpus urls.txt
+'''
+import argparse
+import math
+import random
+from time import perf_counter
+
+from bench_common import load_lambda, percentile
+
+url_codec = load_lambda("url_codec")
+
+DOMAINS = ["www.example.com", "shop.example.co.uk", "news.example.org", "www.youtube.com", "www.amazon.com", "docs.google.com"]
+PATHS = ["/article/{}", "/product/{}", "/watch?v={}", "/blog/2020/05/{}", "/dp/{}", "/document/d/{}/edit"]
+SOURCES = ["newsletter", "twitter", "facebook", "google", "linkedin"]
+
+
+def sample_corpus(count, seed=42):
+    # Short links as well as 1-4 KB tracking URLs, as seen on a URL shortener
+    rng = random.Random(seed)
+    urls = []
+
+    for _ in range(count):
+        token = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789-_") for _ in range(rng.randint(8, 40)))
+        url = "https://" + rng.choice(DOMAINS) + rng.choice(PATHS).format(token)
+
+        if rng.random() < 0.7:
+            url += ("&" if "?" in url else "?") + f"utm_source={rng.choice(SOURCES)}&utm_medium=email&utm_campaign=spring-{rng.randint(1, 99)}"
+
+        if rng.random() < 0.3:
+            # Opaque tracking payloads (click IDs, signed redirects) barely compress
+            url += "&gclid=" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789") for _ in range(rng.randint(100, 3000)))
+
+        urls.append(url)
+
+    return urls
+
+
+def item_size(short_url, attributes):
+    # DynamoDB item size: attribute names plus values (UTF-8 strings, raw binaries)
+    size = len("short_url") + len(short_url)
+    for name, value in attributes.items():
+        size += len(name) + len(value['S'].encode() if 'S' in value else value['B'])
+
+    return size
+
+
+def run(encoding, urls):
+    sizes, encode_us, decode_us = [], [], []
+
+    for i, url in enumerate(urls):
+        start = perf_counter()
+        attributes = url_codec.long_url_attributes(url, encoding)
+        encoded = perf_counter()
+        assert url_codec.long_url_of(attributes) == url
+        decoded = perf_counter()
+
+        sizes.append(item_size(f"{i:016x}", attributes))
+        encode_us.append((encoded - start) * 1000000)
+        decode_us.append((decoded - encoded) * 1000000)
+
+    encode_us.sort()
+    decode_us.sort()
+
+    return {
+        'bytes': sum(sizes) / len(sizes),
+        'wcu': sum(math.ceil(size / 1024) for size in sizes) / len(sizes),
+        'rcu': sum(math.ceil(size / 4096) * 0.5 for size in sizes) / len(sizes),
+        'encode_p50': percentile(encode_us, 50),
+        'decode_p50': percentile(decode_us, 50),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=5000, help="size of the generated corpus")
+    parser.add_argument("--corpus", help="file with one Long URL per line, instead of the generated corpus")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as fp:
+            urls = [line.strip() for line in fp if line.strip()]
+    else:
+        urls = sample_corpus(args.urls)
+
+    encodings = ["plain", "zlib"] + (["zstd"] if url_codec.zstd_codec() else [])
+
+    print(f"{'encoding':<12}{'bytes/item':>12}{'WCU/put':>10}{'RCU/get':>10}{'encode p50 us':>16}{'decode p50 us':>16}")
+    for encoding in encodings:
+        result = run(encoding, urls)
+        print(f"{encoding:<12}{result['bytes']:>12.1f}{result['wcu']:>10.3f}{result['rcu']:>10.3f}{result['encode_p50']:>16.1f}{result['decode_p50']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+''' 
+Replays the sample REST API (payload format 1.0) and HTTP API (payload format 2.0) events of bench/events
+through lambda_handler against an in-memory DynamoDB stand-in, reporting the handler latency of each shape;
+
+    $ python bench/bench_event_shapes.py --requests 5000
+'''
+import argparse
+import contextlib
+import glob
+import json
+import os
+from time import perf_counter
+
+from bench_common import BENCH_DIR, load_lambda, percentile, use_ddb
+from fake_ddb import FakeDynamoDB
+
+lambda_function = load_lambda()
+
+
+def run(event, requests):
+    samples = []
+
+    # Every invocation writes its EMF log line, discarded so that the terminal I/O stays out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(requests):
+            start = perf_counter()
+            response = lambda_function.lambda_handler(event, None)
+            samples.append((perf_counter() - start) * 1000000)
+
+    samples.sort()
+    return samples, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="replays per sample event")
+    args = parser.parse_args()
+
+    use_ddb(FakeDynamoDB())
+
+    print(f"{'event':<24}{'status':>8}{'p50 us':>10}{'p99 us':>10}")
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "events", "*.json"))):
+        with open(path) as fp:
+            event = json.load(fp)
+
+        samples, response = run(event, args.requests)
+        print(f"{os.path.basename(path)[:-5]:<24}{response['statusCode']:>8}{percentile(samples, 50):>10.1f}{percentile(samples, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+''' 
+Compares the shorten latency of the unique ID generators against an in-memory DynamoDB stand-in;
+
+    $ python bench/bench_id_generation.py --requests 2000 --latency-ms 5
+'''
+import argparse
+from time import perf_counter
+
+from bench_common import configure, load_lambda, percentile, use_ddb
+from fake_ddb import FakeDynamoDB
+
+shorten = load_lambda("shorten")
+
+# (label, ID_GENERATOR, COUNTER_BLOCK_SIZE)
+MODES = [
+    ("counter, block of 1", "counter", 1),
+    ("counter, block of 1000", "counter", 1000),
+    ("snowflake", "snowflake", 1),
+]
+
+
+def run(generator, block_size, requests, latency):
+    fake = FakeDynamoDB(latency=latency)
+
+    use_ddb(fake)
+    configure(id_generator=generator, counter_block_size=block_size)
+    shorten.counter_block.update({'next': 0, 'end': 0})
+
+    samples = []
+    for i in range(requests):
+        start = perf_counter()
+        result = shorten.shorten(f"https://example.com/article/{i}", "cdn.example.com", "203.0.113.10")
+        samples.append((perf_counter() - start) * 1000)
+
+        assert result['statusCode'] == '200', result
+
+    samples.sort()
+    return samples, sum(fake.calls.values()) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="shorten calls per mode")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated DynamoDB round trip")
+    args = parser.parse_args()
+
+    print(f"{'mode':<24}{'p50 ms':>10}{'p99 ms':>10}{'DDB calls/req':>16}")
+    for label, generator, block_size in MODES:
+        samples, calls = run(generator, block_size, args.requests, args.latency_ms / 1000)
+        print(f"{label:<24}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{calls:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
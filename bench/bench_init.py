@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+''' 
+Compares the first request latency of fresh containers with and without the INIT phase warm-up
+(WARM_UP_ON_INIT), using an in-memory DynamoDB stand-in whose first call pays a simulated connection setup;
+
+    $ python bench/bench_init.py --runs 30 --connect-ms 40 --latency-ms 5
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench_common import BENCH_DIR, ENVIRONMENT, LAMBDA_DIR, percentile
+
+# Runs in a fresh interpreter; the stand-in is injected through botocore's session so that it's in place during INIT
+SNIPPET = """
+import json
+import botocore.session
+from time import perf_counter
+from fake_ddb import FakeDynamoDB
+
+fake = FakeDynamoDB(latency=LATENCY, connect_latency=CONNECT_LATENCY)
+
+class FakeSession:
+    def create_client(self, *args, **kwargs):
+        return fake
+
+botocore.session.get_session = FakeSession
+start = perf_counter()
+import lambda_function
+init = perf_counter()
+lambda_function.lambda_handler(json.load(open('EVENT_PATH')), None)
+first = perf_counter()
+print(json.dumps({'init_ms': (init - start) * 1000, 'first_ms': (first - init) * 1000}))
+"""
+
+
+def run_once(warm_up, latency, connect_latency):
+    snippet = (
+        SNIPPET.replace("EVENT_PATH", os.path.join(BENCH_DIR, "events", "rest_v1_unshorten.json"))
+        .replace("CONNECT_LATENCY", str(connect_latency))
+        .replace("LATENCY", str(latency))
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([LAMBDA_DIR, BENCH_DIR, os.environ.get("PYTHONPATH", "")]), **ENVIRONMENT)
+    env["WARM_UP_ON_INIT"] = "true" if warm_up else "false"
+
+    proc = subprocess.run([sys.executable, "-c", snippet], env=env, capture_output=True, text=True, check=True)
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30, help="fresh containers per mode")
+    parser.add_argument("--connect-ms", type=float, default=40.0, help="simulated connection setup of the first DynamoDB call")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated DynamoDB round trip")
+    args = parser.parse_args()
+
+    print(f"{'mode':<24}{'init p50 ms':>14}{'first p50 ms':>14}{'first p99 ms':>14}")
+    for label, warm_up in (("cold (no warm-up)", False), ("warm-up during INIT", True)):
+        runs = [run_once(warm_up, args.latency_ms / 1000, args.connect_ms / 1000) for _ in range(args.runs)]
+        init = sorted(run['init_ms'] for run in runs)
+        first = sorted(run['first_ms'] for run in runs)
+        print(f"{label:<24}{percentile(init, 50):>14.2f}{percentile(first, 50):>14.2f}{percentile(first, 99):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+'''
+Drives lambda_handler with shorten and unshorten traffic across concurrent containers, against in-memory DynamoDB
+stand-ins with a latency/throttling profile (see fake_ddb.PROFILES), reporting the throughput and the p50/p95/p99
+latency of each route. A Lambda container serves one request at a time, so every container is a process of its own
+(with its own cache, counter block and DynamoDB stand-in, seeded with the same Short URLs), configured with the
+environment the stack deploys for the context values of cdk.json (counter block size and shards, cache, code alphabet..).
+
+The traffic is either synthetic (a share of reads over a skewed working set of Short URLs) or replayed from recorded
+logs: JSON lines of API Gateway access logs (with "httpMethod" and "path") or of the Lambda function's own
+unshorten log lines (with "action" and "short_url"), as exported from CloudWatch Logs;
+
+    $ python bench/bench_load.py --requests 20000 --containers 8 --read-ratio 0.95 --profile dynamodb
+    $ python bench/bench_load.py --replay access_logs.jsonl --containers 8 --profile brownout --cache-size 10000
+'''
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import re
+from collections import Counter
+from time import perf_counter
+
+from bench_common import load_lambda, percentile, stack_environment
+
+UNSHORTEN_PATH = re.compile(r"/unshorten/([^/?]+)$")
+
+
+def synthetic_workload(requests, read_ratio, codes, skew, seed=42):
+    # Reads follow a Zipf-like popularity over the working set, as redirects of a few Short URLs dominate
+    rng = random.Random(seed)
+    working_set = [f"c{i:08d}" for i in range(codes)]
+    weights = [1 / (rank + 1) ** skew for rank in range(codes)]
+    reads = rng.choices(working_set, weights=weights, k=requests)
+
+    workload = []
+    for i in range(requests):
+        if rng.random() < read_ratio:
+            workload.append(("unshorten", reads[i], f"198.51.100.{i % 250}"))
+        else:
+            workload.append(("shorten", f"https://www.example.com/article/{i}?utm_source=newsletter", f"198.51.100.{i % 250}"))
+
+    return workload, working_set
+
+
+def replayed_workload(path):
+    '''
+    Turn recorded log lines into a workload; Short URLs that weren't recorded as 404s are seeded,
+    and shortened Long URLs (request bodies aren't logged) are synthetic;
+    '''
+    workload, seeded = [], set()
+
+    with open(path) as fp:
+        for line in fp:
+            # CloudWatch Logs exports prefix every message with a timestamp
+            start = line.find("{")
+            if start < 0:
+                continue
+
+            try:
+                record = json.loads(line[start:])
+            except ValueError:
+                continue
+
+            ip = record.get("ip") or record.get("sourceIp") or "198.51.100.1"
+            status = str(record.get("status", ""))
+
+            if record.get("action") == "unshorten":
+                short_url = record.get("short_url")
+            else:
+                method, match = record.get("httpMethod"), UNSHORTEN_PATH.search(record.get("path") or "")
+                short_url = match.group(1) if method == "GET" and match else None
+
+                if method == "POST" and (record.get("path") or "").endswith("/shorten"):
+                    workload.append(("shorten", f"https://www.example.com/replayed/{len(workload)}", ip))
+                    continue
+
+            if short_url:
+                workload.append(("unshorten", short_url, ip))
+
+                if status != "404":
+                    seeded.add(short_url)
+
+    return workload, sorted(seeded)
+
+
+def run_container(job):
+    # Runs in a process of its own, like a Lambda container, and returns (route, status, ms) samples
+    workload, seeded, profile, api, seed = job
+
+    lambda_function = load_lambda()
+    import common
+    from event_builders import shorten_event, unshorten_event
+    from fake_ddb import FakeDynamoDB
+    from url_codec import mapping_item
+
+    fake = FakeDynamoDB(profile=profile, seed=seed)
+    table = fake.tables.setdefault(common.settings.mapping_table, {})
+    for short_url in seeded:
+        table[short_url] = mapping_item(short_url, f"https://www.example.com/{short_url}", common.settings.url_encoding)
+
+    common.ddb = common.ddb_reader = fake
+
+    samples = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for kind, value, ip in workload:
+            event = shorten_event(value, api, ip) if kind == "shorten" else unshorten_event(value, api, ip)
+
+            start = perf_counter()
+            response = lambda_function.lambda_handler(event, None)
+            samples.append((kind, str(response['statusCode']), (perf_counter() - start) * 1000))
+
+    return samples, fake.calls, fake.throttled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="synthetic requests")
+    parser.add_argument("--read-ratio", type=float, default=0.95, help="share of unshorten requests (synthetic)")
+    parser.add_argument("--codes", type=int, default=10000, help="Short URLs of the working set (synthetic)")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of the Short URL popularity (synthetic)")
+    parser.add_argument("--replay", help="JSON lines log file to replay instead of the synthetic traffic")
+    parser.add_argument("--containers", type=int, default=4, help="concurrent containers (processes)")
+    parser.add_argument("--profile", choices=["none", "dynamodb", "brownout", "throttled"], default="dynamodb", help="DynamoDB latency/throttling profile")
+    parser.add_argument("--api", choices=["rest", "http"], default="rest", help="event payload format")
+    parser.add_argument("--cache-size", type=int, help="CACHE_SIZE of the containers, instead of the stack's")
+    args = parser.parse_args()
+
+    if args.replay:
+        workload, seeded = replayed_workload(args.replay)
+    else:
+        workload, seeded = synthetic_workload(args.requests, args.read_ratio, args.codes, args.skew)
+
+    # Inherited by the container processes before they import the Lambda function; the INIT-phase warm-up is left out,
+    # as the containers never reach AWS
+    environment = dict(stack_environment(), WARM_UP_ON_INIT="false")
+
+    if args.cache_size is not None:
+        environment["CACHE_SIZE"] = str(args.cache_size)
+
+    os.environ.update(environment)
+    print("Containers configured with " + ", ".join(f"{name}={environment[name]}" for name in ("CACHE_SIZE", "COUNTER_BLOCK_SIZE", "COUNTER_SHARDS", "CODE_ALPHABET", "DEDUPE") if name in environment))
+
+    # Requests are spread round-robin, every container serving its share one request at a time
+    jobs = [(workload[i::args.containers], seeded, args.profile, args.api, i) for i in range(args.containers)]
+
+    start = perf_counter()
+    with multiprocessing.Pool(args.containers) as pool:
+        results = pool.map(run_container, jobs)
+    elapsed = perf_counter() - start
+
+    samples = [sample for container_samples, _, _ in results for sample in container_samples]
+    calls = sum((Counter(container_calls) for _, container_calls, _ in results), Counter())
+    throttled = sum(container_throttled for _, _, container_throttled in results)
+
+    print(f"{len(samples)} requests over {args.containers} containers in {elapsed:.2f}s: {len(samples) / elapsed:.0f} requests/s")
+    print(f"DynamoDB calls: {dict(calls)}, throttled: {throttled}\n")
+
+    print(f"{'route':<12}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for kind in ("shorten", "unshorten"):
+        latencies = sorted(ms for sample_kind, _, ms in samples if sample_kind == kind)
+
+        if latencies:
+            statuses = Counter(status for sample_kind, status, _ in samples if sample_kind == kind)
+            print(f"{kind:<12}{len(latencies):>10}{percentile(latencies, 50):>10.3f}{percentile(latencies, 95):>10.3f}{percentile(latencies, 99):>10.3f}  {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
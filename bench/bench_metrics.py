@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+'''
+Measures the overhead of the per-invocation timing instrumentation (lambda_proxy/metrics.py): the cost of recording
+a phase and a counter, of emitting the EMF log line, and of a whole unshorten invocation with and without it,
+against an in-memory DynamoDB stand-in;
+
+    $ python bench/bench_metrics.py --iterations 200000
+'''
+import argparse
+import contextlib
+import os
+from time import perf_counter
+
+from bench_common import load_lambda, percentile, use_ddb
+from event_builders import unshorten_event
+from fake_ddb import FakeDynamoDB
+
+lambda_function = load_lambda()
+import common  # noqa: E402
+
+
+def per_call_ns(function, iterations):
+    start = perf_counter()
+    for _ in range(iterations):
+        function()
+
+    return (perf_counter() - start) * 1000000000 / iterations
+
+
+def handler_us(event, requests):
+    samples = []
+    for _ in range(requests):
+        start = perf_counter()
+        lambda_function.lambda_handler(event, None)
+        samples.append((perf_counter() - start) * 1000000)
+
+    samples.sort()
+    return percentile(samples, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="calls per measurement")
+    args = parser.parse_args()
+
+    timing = common.timing
+    use_ddb(FakeDynamoDB())
+    event = unshorten_event("0123456789abcdef")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        record_ns = per_call_ns(lambda: timing.record('phase', perf_counter()), args.iterations)
+        count_ns = per_call_ns(lambda: timing.count('calls'), args.iterations)
+
+        # A typical unshorten record: 4 phases, 2 counters and 6 properties
+        def emit():
+            timing.start()
+            for phase in ('parse', 'cache_lookup', 'ddb_get'):
+                timing.record(phase, perf_counter())
+            timing.count('cache_misses')
+            timing.count('ddb_calls')
+            timing.set(action='unshorten', short_url='0123456789abcdef', cache='miss', cache_stats={'hits': 0, 'misses': 1}, status='301')
+            timing.emit()
+
+        emit_us = per_call_ns(emit, args.iterations // 10) / 1000
+
+        instrumented_us = handler_us(event, args.iterations // 10)
+
+        # The same invocations with every Timing method turned into a no-op
+        for name in ('start', 'record', 'count', 'set', 'emit'):
+            setattr(timing, name, lambda *args, **kwargs: None)
+        bare_us = handler_us(event, args.iterations // 10)
+
+    print(f"{'measurement':<36}{'cost':>12}")
+    print(f"{'record a phase':<36}{record_ns:>9.0f} ns")
+    print(f"{'count':<36}{count_ns:>9.0f} ns")
+    print(f"{'full unshorten record + EMF line':<36}{emit_us:>9.2f} us")
+    print(f"{'unshorten invocation, instrumented':<36}{instrumented_us:>9.2f} us")
+    print(f"{'unshorten invocation, no-op timing':<36}{bare_us:>9.2f} us")
+
+
+if __name__ == "__main__":
+    main()
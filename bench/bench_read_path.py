@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+''' 
+Compares the unshorten latency of reading from DynamoDB, through DAX, and through an unavailable DAX cluster
+(falling back to DynamoDB), against in-memory stand-ins; the container cache is disabled so that every request reads;
+
+    $ python bench/bench_read_path.py --requests 2000 --ddb-latency-ms 5 --dax-latency-ms 0.5
+'''
+import argparse
+import contextlib
+import io
+from time import perf_counter
+
+from bench_common import load_lambda, percentile, use_ddb
+from fake_ddb import FakeDax, FakeDynamoDB
+
+unshorten = load_lambda("unshorten")
+
+
+def run(mode, requests, ddb_latency, dax_latency):
+    fake = FakeDynamoDB(latency=ddb_latency)
+    dax = FakeDax(fake, latency=dax_latency, available=mode != "dax unavailable")
+
+    for i in range(requests):
+        fake.put_item(TableName=unshorten.settings.mapping_table, Item={'short_url': {'S': f"code{i}"}, 'long_url': {'S': f"https://example.com/{i}"}})
+    fake.calls.clear()
+
+    use_ddb(fake, reader=None if mode == "dynamodb" else dax)
+    unshorten.url_cache.max_size = 0
+
+    # The Lambda function logs every request (and every DAX failure), which isn't part of the measurement
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(requests):
+            start = perf_counter()
+            result = unshorten.unshorten(f"code{i}")
+            samples.append((perf_counter() - start) * 1000)
+
+            assert result['statusCode'] == '301', result
+
+    samples.sort()
+    return samples, sum(fake.calls.values()) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="unshorten calls per mode")
+    parser.add_argument("--ddb-latency-ms", type=float, default=5.0, help="simulated DynamoDB round trip")
+    parser.add_argument("--dax-latency-ms", type=float, default=0.5, help="simulated DAX round trip (cache hit)")
+    args = parser.parse_args()
+
+    print(f"{'mode':<24}{'p50 ms':>10}{'p99 ms':>10}{'DDB calls/req':>16}")
+    for mode in ("dynamodb", "dax", "dax unavailable"):
+        samples, calls = run(mode, args.requests, args.ddb_latency_ms / 1000, args.dax_latency_ms / 1000)
+        print(f"{mode:<24}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{calls:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+''' 
+Compares the Short URL code alphabets (CODE_ALPHABET): code length, encode cost per million codes and the probability
+of a hash collision at a given volume of stored Short URLs (each collision costs one more conditional PUT);
+
+    $ python bench/bench_short_codes.py --digest-size 8 --volume 100000000
+    $ python bench/bench_short_codes.py --digest-size 8 --length 7 --volume 100000000
+'''
+import argparse
+import math
+import os
+from time import perf_counter
+
+from bench_common import load_lambda
+
+short_codes = load_lambda("short_codes")
+
+
+def encode_seconds_per_million(alphabet, digest_size, length, samples):
+    digests = [os.urandom(digest_size) for _ in range(samples)]
+
+    start = perf_counter()
+    for digest in digests:
+        short_codes.encode_code(digest, alphabet, length)
+
+    return (perf_counter() - start) * 1000000 / samples
+
+
+def collision_report(space, volume):
+    # Birthday bound: probability that any two of the stored codes collide, and that a new code hits a stored one
+    any_collision = -math.expm1(-volume * (volume - 1) / (2 * space))
+    next_collision = volume / space
+
+    return any_collision, next_collision
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--digest-size", type=int, default=8, help="HASH_DIGEST_SIZE, in bytes")
+    parser.add_argument("--length", type=int, default=0, help="CODE_LENGTH (0 for the full width)")
+    parser.add_argument("--volume", type=float, default=1e8, help="stored Short URLs")
+    parser.add_argument("--samples", type=int, default=200000, help="codes encoded per alphabet")
+    args = parser.parse_args()
+
+    print(f"{'alphabet':<10}{'length':>8}{'bits':>8}{'s per 1M codes':>16}{'P(any collision)':>18}{'P(next collides)':>18}")
+    for alphabet, symbols in short_codes.ALPHABETS.items():
+        width = short_codes.code_width(args.digest_size, alphabet)
+        length = min(args.length or width, width)
+        space = min(len(symbols) ** length, 2 ** (args.digest_size * 8))
+        any_collision, next_collision = collision_report(space, args.volume)
+        seconds = encode_seconds_per_million(alphabet, args.digest_size, args.length, args.samples)
+
+        print(f"{alphabet:<10}{length:>8}{math.log2(space):>8.1f}{seconds:>16.3f}{any_collision:>18.3e}{next_collision:>18.3e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+
+# API Gateway proxy events, reduced to the fields API Gateway always sends and the Lambda function reads;
+# bench/events holds complete sample events of both payload formats
+CDN_PREFIX = "d111111abcdef8.cloudfront.net"
+CLIENT_IP = "203.0.113.10"
+
+
+def rest_event(method, resource, path, body=None, client_ip=CLIENT_IP):
+    # REST API (payload format 1.0) event
+    return {
+        "resource": resource,
+        "path": path,
+        "httpMethod": method,
+        "headers": {"X-Forwarded-For": f"{client_ip}, 70.132.20.1"},
+        "requestContext": {"identity": {"sourceIp": "70.132.20.1"}},
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def http_event(method, route, path, body=None, client_ip=CLIENT_IP):
+    # HTTP API (payload format 2.0) event
+    return {
+        "version": "2.0",
+        "routeKey": f"{method} {route}",
+        "rawPath": path,
+        "headers": {"x-forwarded-for": f"{client_ip}, 70.132.20.1"},
+        "requestContext": {"http": {"method": method, "path": path, "sourceIp": "70.132.20.1"}},
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def api_event(api, method, route, path, body=None, client_ip=CLIENT_IP):
+    # Event of either API flavour ("rest" or "http", as per the api_type context value)
+    builder = http_event if api == "http" else rest_event
+
+    return builder(method, route, path, body, client_ip)
+
+
+def shorten_event(long_url, api="rest", client_ip=CLIENT_IP):
+    return api_event(api, "POST", "/shorten", "/shorten", {"url_long": long_url, "cdn_prefix": CDN_PREFIX}, client_ip)
+
+
+def shorten_batch_event(long_urls, api="rest", client_ip=CLIENT_IP):
+    return api_event(api, "POST", "/shorten/batch", "/shorten/batch", {"urls": long_urls, "cdn_prefix": CDN_PREFIX}, client_ip)
+
+
+def unshorten_event(short_url, api="rest", client_ip=CLIENT_IP):
+    return api_event(api, "GET", "/unshorten/{shorturl}", f"/unshorten/{short_url}", None, client_ip)
+
+
+def unshorten_batch_event(short_urls, api="rest", client_ip=CLIENT_IP):
+    return api_event(api, "POST", "/unshorten/batch", "/unshorten/batch", {"short_urls": short_urls}, client_ip)
@@ -0,0 +1,227 @@
+import math
+import random
+import re
+import threading
+from time import sleep
+
+# Latency and throttling profiles: (p50 seconds, p99 seconds, probability of a throttled call)
+PROFILES = {
+    'none': (0.0, 0.0, 0.0),
+    'dynamodb': (0.004, 0.012, 0.0),
+    'brownout': (0.010, 0.080, 0.02),
+    'throttled': (0.005, 0.020, 0.2),
+}
+
+# Key conditions supported by FakeDynamoDB.query
+KEY_CONDITION = re.compile(r"(\S+) = (:\w+)(?: AND (?:begins_with\((\S+), (:\w+)\)|(\S+) BETWEEN (:\w+) AND (:\w+)))?")
+
+
+class FakeClientError(Exception):
+    ''' 
+    Mimics botocore's ClientError closely enough for the Lambda function,
+    which only looks at the error code under e.response;
+    '''
+    def __init__(self, code, message="", **response):
+        super().__init__(f"An error occurred ({code}): {message}")
+        self.response = dict(response, Error={'Code': code, 'Message': message})
+
+
+class FakeDynamoDB:
+    ''' 
+    In-memory stand-in for the low-level boto3 DynamoDB client, covering the calls the Lambda function makes;
+    every call sleeps for "latency" seconds to approximate a network round trip, and the very first one
+    additionally for "connect_latency" seconds to approximate opening the connection; a profile (see PROFILES)
+    instead draws the latency of every call from a log-normal distribution and throttles a share of the calls;
+    '''
+    def __init__(self, latency=0.0, connect_latency=0.0, profile=None, seed=None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.profile = PROFILES[profile] if profile else None
+        self.random = random.Random(seed)
+        self.tables = {}
+        self.calls = {}
+        self.throttled = 0
+        # TransactItems of the committed transactions, per ClientRequestToken
+        self.transactions = {}
+        self.lock = threading.Lock()
+
+    def _call(self, name):
+        with self.lock:
+            connect = not self.calls
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+        if connect and self.connect_latency:
+            sleep(self.connect_latency)
+
+        if self.profile:
+            self._profiled_call()
+        elif self.latency:
+            sleep(self.latency)
+
+    def _profiled_call(self):
+        p50, p99, throttle_rate = self.profile
+
+        if p50:
+            # Log-normal latency with the profile's median and 99th percentile (z = 2.326)
+            mu = math.log(p50)
+            sleep(self.random.lognormvariate(mu, (math.log(p99) - mu) / 2.326))
+
+        if self.random.random() < throttle_rate:
+            with self.lock:
+                self.throttled += 1
+
+            raise FakeClientError('ProvisionedThroughputExceededException', "The level of configured provisioned throughput for the table was exceeded")
+
+    def _table(self, name):
+        return self.tables.setdefault(name, {})
+
+    def _key(self, key):
+        # Items are keyed on their partition key, or on (partition key, sort key) in tables with a sort key
+        values = tuple(value['S'] for value in key.values())
+
+        return values[0] if len(values) == 1 else values
+
+    def put_item(self, TableName, Item, ConditionExpression=None, **kwargs):
+        self._call('put_item')
+        key = next(iter(Item.values()))['S']  # Items are keyed on their first (partition key) attribute
+
+        with self.lock:
+            table = self._table(TableName)
+
+            if ConditionExpression and ConditionExpression.startswith('attribute_not_exists') and key in table:
+                raise FakeClientError('ConditionalCheckFailedException', "The conditional request failed")
+
+            table[key] = Item
+
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def get_item(self, TableName, Key, **kwargs):
+        self._call('get_item')
+        item = self._table(TableName).get(self._key(Key))
+
+        return {'Item': item, 'ResponseMetadata': {'HTTPStatusCode': 200}} if item else {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        self._call('update_item')
+        # Only the "ADD <attr> :q" form used for counters is supported, optionally followed by "SET <attr> = :value"
+        words = UpdateExpression.split()
+        attr = words[1]
+
+        with self.lock:
+            item = self._table(TableName).setdefault(self._key(Key), dict(Key))
+            value = int(item.get(attr, {'N': '0'})['N']) + int(ExpressionAttributeValues[':q']['N'])
+            item[attr] = {'N': str(value)}
+
+            if len(words) == 7 and words[3] == 'SET':
+                item[words[4]] = ExpressionAttributeValues[words[6]]
+
+        return {'Attributes': {attr: {'N': str(value)}}, 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        self._call('batch_write_item')
+
+        for table, requests in RequestItems.items():
+            if len(requests) > 25:
+                raise FakeClientError('ValidationException', "Too many items requested for the BatchWriteItem call")
+
+            keys = [next(iter(request['PutRequest']['Item'].values()))['S'] for request in requests]
+
+            if len(set(keys)) != len(keys):
+                raise FakeClientError('ValidationException', "Provided list of item keys contains duplicates")
+
+            with self.lock:
+                for key, request in zip(keys, requests):
+                    self._table(table)[key] = request['PutRequest']['Item']
+
+        return {'UnprocessedItems': {}, 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None, **kwargs):
+        self._call('transact_write_items')
+        # Only Puts, optionally conditional on "attribute_not_exists", are supported; every item is written or none
+        puts = [entry['Put'] for entry in TransactItems]
+        keys = [(put['TableName'], next(iter(put['Item'].values()))['S']) for put in puts]
+
+        if len(puts) > 100 or len(set(keys)) != len(keys):
+            raise FakeClientError('ValidationException', "Too many items or more than one operation on the same item in the TransactWriteItems call")
+
+        with self.lock:
+            # A retry of a committed transaction succeeds without writing anything (the 10 minutes window aside)
+            if ClientRequestToken in self.transactions:
+                if self.transactions[ClientRequestToken] != TransactItems:
+                    raise FakeClientError('IdempotentParameterMismatchException', "The request uses the same client token as a previous, but non-identical request")
+
+                return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+            reasons = [
+                {'Code': 'ConditionalCheckFailed' if put.get('ConditionExpression', '').startswith('attribute_not_exists') and key in self._table(table) else 'None'}
+                for put, (table, key) in zip(puts, keys)
+            ]
+
+            if any(reason['Code'] != 'None' for reason in reasons):
+                raise FakeClientError('TransactionCanceledException', "Transaction cancelled, please refer cancellation reasons for specific reasons", CancellationReasons=reasons)
+
+            for put, (table, key) in zip(puts, keys):
+                self._table(table)[key] = put['Item']
+
+            if ClientRequestToken:
+                self.transactions[ClientRequestToken] = TransactItems
+
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self._call('batch_get_item')
+        responses = {}
+
+        for table, request in RequestItems.items():
+            keys = [next(iter(key.values()))['S'] for key in request['Keys']]
+
+            if len(keys) > 100 or len(set(keys)) != len(keys):
+                raise FakeClientError('ValidationException', "Too many or duplicate keys in the BatchGetItem call")
+
+            with self.lock:
+                responses[table] = [self._table(table)[key] for key in keys if key in self._table(table)]
+
+        return {'Responses': responses, 'UnprocessedKeys': {}, 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, IndexName=None, ExpressionAttributeNames=None, Limit=None, **kwargs):
+        self._call('query')
+        # Only "<key> = :value", optionally followed by "AND begins_with(<sort key>, :prefix)"
+        # or "AND <sort key> BETWEEN :from AND :to", is supported
+        match = KEY_CONDITION.fullmatch(KeyConditionExpression)
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues
+        attr = names.get(match.group(1), match.group(1))
+
+        def matches(item):
+            if item.get(attr) != values[match.group(2)]:
+                return False
+
+            if match.group(3):
+                return item.get(names.get(match.group(3), match.group(3)), {}).get('S', '').startswith(values[match.group(4)]['S'])
+
+            if match.group(5):
+                value = item.get(names.get(match.group(5), match.group(5)), {}).get('S')
+                return value is not None and values[match.group(6)]['S'] <= value <= values[match.group(7)]['S']
+
+            return True
+
+        with self.lock:
+            items = [item for key, item in sorted(self._table(TableName).items(), key=lambda entry: str(entry[0])) if matches(item)]
+
+        return {'Items': items[:Limit], 'Count': len(items[:Limit]), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+
+class FakeDax(FakeDynamoDB):
+    ''' 
+    In-memory stand-in for the DAX client, serving reads from the tables of the given FakeDynamoDB with its own
+    (lower) latency; with available set to False every call fails, as if the cluster were unreachable;
+    '''
+    def __init__(self, backend, latency=0.0, available=True):
+        super().__init__(latency=latency)
+        self.tables = backend.tables
+        self.available = available
+
+    def _call(self, name):
+        if not self.available:
+            raise ConnectionError("Couldn't connect to the DAX cluster")
+
+        super()._call(name)
@@ -0,0 +1,37 @@
+import threading
+import uuid
+from time import sleep
+
+
+class FakeSQS:
+    ''' 
+    In-memory stand-in for the low-level SQS client, covering the calls the click stream makes; every call sleeps
+    for "latency" seconds to approximate a network round trip; the messages sent are handed out as the SQS events
+    the click aggregator Lambda function is invoked with;
+    '''
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ValueError("Too many entries in the SendMessageBatch call")
+
+        if self.latency:
+            sleep(self.latency)
+
+        with self.lock:
+            self.calls += 1
+            self.messages.extend(entry['MessageBody'] for entry in Entries)
+
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def events(self, batch_size=10):
+        # Drains the queue as SQS events of up to batch_size messages, as the Lambda event source would
+        with self.lock:
+            messages, self.messages = self.messages, []
+
+        for i in range(0, len(messages), batch_size):
+            yield {'Records': [{'messageId': str(uuid.uuid4()), 'body': body} for body in messages[i:i + batch_size]]}
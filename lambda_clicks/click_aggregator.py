@@ -0,0 +1,80 @@
+import os
+import json
+import random
+import boto3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from click_counters import SHARDS, BUCKET_RETENTION, SUMMARY_PREFIX, shard_key, bucket
+
+CLICKS_TABLE = os.environ["URL_SHORTENER_CLICKS_TABLE"]
+WRITERS = int(os.environ.get("WRITERS", "8"))
+
+ddb = boto3.client("dynamodb")
+
+
+def lambda_handler(event, context):
+    # Every SQS message is a JSON list of [short_url, epoch seconds, referrer host, country] click records
+    batches = [json.loads(record["body"]) for record in event["Records"]]
+    counts = rollup(batches)
+
+    write(counts)
+
+    print(f"Rolled up {sum(len(batch) for batch in batches)} clicks into {len(counts)} counters.")
+
+
+def rollup(batches):
+    '''
+    Combine the clicks of the whole SQS batch in memory into (Short URL, counter) -> clicks, so that every counter
+    is written once per batch however many clicks it got: the "sum#total", "sum#ref#<referrer host>" and
+    "sum#geo#<country>" summary counters, and the "minute#", "hour#" and "day#" buckets of the click series;
+    '''
+    counts = Counter()
+
+    for batch in batches:
+        for short_url, timestamp, referrer, country in batch:
+            counts[(short_url, SUMMARY_PREFIX + "total")] += 1
+
+            if referrer:
+                counts[(short_url, f"{SUMMARY_PREFIX}ref#{referrer}")] += 1
+
+            if country:
+                counts[(short_url, f"{SUMMARY_PREFIX}geo#{country}")] += 1
+
+            for granularity in ("minute", "hour", "day"):
+                counts[(short_url, bucket(granularity, timestamp))] += 1
+
+    return counts
+
+
+def write(counts):
+    '''
+    Add the combined increments to the counters of a shard picked at random per Short URL and batch, so that the
+    concurrent aggregator invocations spread the writes of a popular Short URL across SHARDS partition keys;
+    BatchWriteItem can't increment, so the increments are concurrent UpdateItem calls;
+    '''
+    shards = {short_url: random.randrange(SHARDS) for short_url, _ in counts}
+    now = int(time())
+
+    def increment(counter):
+        (short_url, name), clicks = counter
+        values = {":q": {"N": str(clicks)}}
+        update = "ADD clicks :q"
+
+        # Minute and hour buckets expire (DynamoDB TTL), so that the table doesn't grow with every minute of every Short URL
+        retention = BUCKET_RETENTION.get(name.split("#", 1)[0])
+
+        if retention:
+            values[":e"] = {"N": str(now + retention)}
+            update += " SET expires_at = :e"
+
+        ddb.update_item(
+            TableName=CLICKS_TABLE,
+            Key={"id": {"S": shard_key(short_url, shards[short_url])}, "counter": {"S": name}},
+            UpdateExpression=update,
+            ExpressionAttributeValues=values,
+        )
+
+    # A failed increment fails the invocation, and SQS redelivers the whole batch (counts are at-least-once)
+    with ThreadPoolExecutor(max_workers=WRITERS) as executor:
+        list(executor.map(increment, counts.items()))
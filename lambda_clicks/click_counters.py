@@ -0,0 +1,29 @@
+import os
+from datetime import datetime, timezone
+
+# Number of items every counter of a Short URL is spread across ("<short_url>#0".."<short_url>#N-1"),
+# so that the increments of a viral Short URL don't all land on a single partition key
+SHARDS = int(os.environ.get("CLICK_SHARDS", "4"))
+
+# Time buckets of the click series, named after their start in UTC ("hour#2020-06-01T13")
+BUCKET_FORMATS = {
+    "minute": "%Y-%m-%dT%H:%M",
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+}
+BUCKET_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Seconds the minute and hour buckets are kept for (as per the table's expires_at TTL attribute), days are kept forever
+BUCKET_RETENTION = {"minute": 2 * 86400, "hour": 90 * 86400}
+
+# Summary counters of a Short URL: "sum#total", "sum#ref#<referrer host>" and "sum#geo#<country>",
+# which a single Query per shard reads
+SUMMARY_PREFIX = "sum#"
+
+
+def shard_key(short_url, shard):
+    return f"{short_url}#{shard}"
+
+
+def bucket(granularity, timestamp):
+    return f"{granularity}#" + datetime.fromtimestamp(timestamp, timezone.utc).strftime(BUCKET_FORMATS[granularity])
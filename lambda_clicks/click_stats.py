@@ -0,0 +1,124 @@
+import os
+import json
+import boto3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from click_counters import SHARDS, BUCKET_SECONDS, SUMMARY_PREFIX, shard_key, bucket
+
+CLICKS_TABLE = os.environ["URL_SHORTENER_CLICKS_TABLE"]
+
+# Default span of the series of each granularity, and the most buckets a single request may ask for
+DEFAULT_SPANS = {"minute": 3600, "hour": 2 * 86400, "day": 30 * 86400}
+MAX_BUCKETS = 1500
+
+HEADERS = {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+
+ddb = boto3.client("dynamodb")
+
+
+def lambda_handler(event, context):
+    '''
+    GET /stats/{shorturl}?granularity=minute|hour|day&from=<epoch seconds>&to=<epoch seconds>; returns the total
+    clicks, the clicks per referrer host and per country, and the series of clicks per time bucket (zero-filled);
+    pathParameters and queryStringParameters are alike in the REST API and HTTP API payload formats;
+    '''
+    short_url = event["pathParameters"]["shorturl"]
+    params = event.get("queryStringParameters") or {}
+    granularity = params.get("granularity", "hour")
+
+    if granularity not in BUCKET_SECONDS:
+        return error("granularity must be minute, hour or day")
+
+    now = int(time())
+
+    try:
+        end = int(params.get("to", now))
+        start = int(params.get("from", end - DEFAULT_SPANS[granularity]))
+    except ValueError:
+        return error("from and to must be epoch seconds")
+
+    # Checked before the buckets are listed, so that a far away "from" can't make the function build millions of them
+    step = BUCKET_SECONDS[granularity]
+    start -= start % step
+
+    if not 0 <= end - start < MAX_BUCKETS * step:
+        return error(f"from must be before to, and the series can't have more than {MAX_BUCKETS} buckets")
+
+    buckets = [bucket(granularity, t) for t in range(start, end + 1, step)]
+
+    summary, series = read_counters(short_url, buckets[0], buckets[-1])
+
+    return {
+        "statusCode": 200,
+        "headers": HEADERS,
+        "body": json.dumps(
+            {
+                "short_url": short_url,
+                "total": summary.get("total", 0),
+                "referrers": {name[4:]: clicks for name, clicks in summary.most_common() if name.startswith("ref#")},
+                "countries": {name[4:]: clicks for name, clicks in summary.most_common() if name.startswith("geo#")},
+                "granularity": granularity,
+                "series": {name.split("#", 1)[1]: series.get(name, 0) for name in buckets},
+            }
+        ),
+    }
+
+
+def read_counters(short_url, first_bucket, last_bucket):
+    '''
+    Read-side merge of the shards: the summary counters and the buckets between first_bucket and last_bucket
+    of every shard are queried concurrently and added up;
+    '''
+    conditions = [
+        ("begins_with(#c, :a)", {":a": {"S": SUMMARY_PREFIX}}),
+        ("#c BETWEEN :a AND :b", {":a": {"S": first_bucket}, ":b": {"S": last_bucket}}),
+    ]
+
+    queries = [(shard_key(short_url, shard), condition) for shard in range(SHARDS) for condition in conditions]
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        results = list(executor.map(lambda args: query(*args), queries))
+
+    summary, series = Counter(), Counter()
+
+    for items in results:
+        for item in items:
+            name, clicks = item["counter"]["S"], int(item["clicks"]["N"])
+
+            if name.startswith(SUMMARY_PREFIX):
+                summary[name[len(SUMMARY_PREFIX):]] += clicks
+            else:
+                series[name] += clicks
+
+    return summary, series
+
+
+def query(key, condition):
+    expression, values = condition
+    kwargs, items = {}, []
+
+    # Paginated, as a Short URL can have more referrers than a single Query page holds
+    while True:
+        response = ddb.query(
+            TableName=CLICKS_TABLE,
+            KeyConditionExpression="#k = :k AND " + expression,
+            ExpressionAttributeNames={"#k": "id", "#c": "counter"},
+            ExpressionAttributeValues=dict(values, **{":k": {"S": key}}),
+            **kwargs,
+        )
+
+        items += response["Items"]
+
+        if "LastEvaluatedKey" not in response:
+            return items
+
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def error(message):
+    return {
+        "statusCode": 400,
+        "headers": HEADERS,
+        "body": json.dumps({"error": message}),
+    }
@@ -0,0 +1,101 @@
+import json
+from time import monotonic
+
+# Lambda@Edge functions can't have environment variables, so the static configuration lives here and the
+# location of the hot-set comes from the custom headers CloudFront adds to the requests to the API origin
+HOTSET_BUCKET_HEADER = "x-hotset-bucket"
+HOTSET_KEY_HEADER = "x-hotset-key"
+HOTSET_REGION_HEADER = "x-hotset-region"
+HOTSET_REFRESH_SECONDS = 60
+HOTSET_FETCH_TIMEOUT = 1
+
+# Used until the first hot-set is loaded, which carries the Cache-Control of the stack's redirect_*_ttl context values
+REDIRECT_CACHE_CONTROL = "public, max-age=0, s-maxage=0"
+
+
+class S3HotSetStore:
+    ''' 
+    Loads the hot-set published by the hot-set builder straight from the S3 bucket with the edge function's role,
+    so that the list of the most requested Long URLs isn't readable by anyone through the distribution;
+    '''
+    def __init__(self, bucket, key, region):
+        self.bucket = bucket
+        self.key = key
+        self.region = region
+        self.client = None
+
+    def load(self):
+        # Created on the first refresh, only botocore is imported as for the proxy Lambda function's DynamoDB client
+        if self.client is None:
+            import botocore.session
+            from botocore.config import Config
+
+            config = Config(connect_timeout=HOTSET_FETCH_TIMEOUT, read_timeout=HOTSET_FETCH_TIMEOUT, retries={'max_attempts': 0})
+            self.client = botocore.session.get_session().create_client('s3', region_name=self.region, config=config)
+
+        return json.loads(self.client.get_object(Bucket=self.bucket, Key=self.key)['Body'].read())
+
+
+class HotSet:
+    ''' 
+    Short URL -> Long URL map of the most requested Short URLs and the Cache-Control of their redirects,
+    refreshed from its store at most once every refresh_seconds; the last known copy is kept if a refresh fails;
+    '''
+    def __init__(self, store, refresh_seconds=HOTSET_REFRESH_SECONDS):
+        self.store = store
+        self.refresh_seconds = refresh_seconds
+        self.urls = {}
+        self.cache_control = REDIRECT_CACHE_CONTROL
+        self.refreshed_at = None
+
+    def get(self, short_url):
+        if self.refreshed_at is None or monotonic() - self.refreshed_at >= self.refresh_seconds:
+            # Whatever the outcome, don't try again before the next refresh is due
+            self.refreshed_at = monotonic()
+
+            try:
+                hot_set = self.store.load()
+                self.urls, self.cache_control = hot_set['urls'], hot_set['cache_control']
+            except Exception as e:
+                print(f"Couldn't refresh the hot-set, keeping the last known copy.\n{e}")
+
+        return self.urls.get(short_url)
+
+
+def resolve(request, hot_set):
+    ''' 
+    Answer the redirect at the edge if the Short URL is in the hot-set, otherwise
+    return the request unchanged so that CloudFront forwards it to the regional origin;
+    '''
+    short_url = request['uri'].lstrip('/')
+
+    long_url = hot_set.get(short_url) if short_url and '/' not in short_url else None
+
+    if long_url is None:
+        return request
+
+    return {
+        'status': '301',
+        'statusDescription': 'Moved Permanently',
+        'headers': {
+            'location': [{'key': 'Location', 'value': long_url}],
+            'cache-control': [{'key': 'Cache-Control', 'value': hot_set.cache_control}],
+            'access-control-allow-origin': [{'key': 'Access-Control-Allow-Origin', 'value': '*'}],
+        },
+    }
+
+
+# Hot-set of this edge container, created on the first request once the distribution domain is known
+hot_set = None
+
+
+def lambda_handler(event, context):
+    global hot_set
+
+    cf = event['Records'][0]['cf']
+
+    if hot_set is None:
+        headers = cf['request']['origin']['custom']['customHeaders']
+        hot_set = HotSet(S3HotSetStore(*(headers[name][0]['value'] for name in (HOTSET_BUCKET_HEADER, HOTSET_KEY_HEADER, HOTSET_REGION_HEADER))))
+
+    return resolve(cf['request'], hot_set)
@@ -0,0 +1,133 @@
+import os
+import gzip
+import json
+import boto3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import sleep, time
+from url_codec import long_url_of
+
+HOTSET_SIZE, HALF_LIFE_MINUTES = int(os.environ['HOTSET_SIZE']), int(os.environ['HALF_LIFE_MINUTES'])
+
+# Cache-Control of the edge redirects, the same as the regional API's (redirect_browser_ttl and redirect_cache_ttl)
+REDIRECT_CACHE_CONTROL = f"public, max-age={os.environ['REDIRECT_MAX_AGE']}, s-maxage={os.environ['REDIRECT_S_MAXAGE']}"
+
+# Scores are kept for more Short URLs than the hot-set holds, so that one climbing the ranking builds up a score
+# comparable to the hot ones' before it enters, and those under MIN_SCORE are dropped
+CANDIDATES = 4 * HOTSET_SIZE
+MIN_SCORE = 1
+
+# CloudFront delivers the log file of a request within an hour, exceptionally up to a day later
+LOG_DELIVERY_HOURS = 24
+
+logs_prefix = os.environ["LOG_PREFIX"] + os.environ["DISTRIBUTION_ID"] + "."
+
+ddb = boto3.client("dynamodb")
+s3 = boto3.client("s3")
+
+
+def lambda_handler(event, context):
+    '''
+    Ranks the Short URLs on the redirects of the distribution's standard logs, which cover the requests answered
+    by CloudFront's cache and the edge function alike: the redirects of the log files delivered since the previous
+    build are added to the scores carried over from it, decayed with a half-life of HALF_LIFE_MINUTES;
+    '''
+    now = int(time())
+    state = load_state(now)
+
+    hits, logs_until = count_redirects(state["logs_until"])
+
+    decay = 0.5 ** ((now - state["generated_at"]) / (HALF_LIFE_MINUTES * 60))
+    scores = Counter({short_url: score * decay for short_url, score in state["scores"].items()})
+    scores.update(hits)
+
+    candidates = {short_url: round(score, 3) for short_url, score in scores.most_common(CANDIDATES) if score >= MIN_SCORE}
+    long_urls = resolve(list(candidates)[:HOTSET_SIZE])
+
+    # Publish the hot-set where the edge function reads it from (outside of what the distribution serves)
+    put_json(os.environ["HOTSET_KEY"], {"generated_at": now, "cache_control": REDIRECT_CACHE_CONTROL, "urls": long_urls})
+    put_json(os.environ["STATE_KEY"], {"generated_at": now, "logs_until": logs_until, "scores": candidates})
+
+    print(f"Published a hot-set of {len(long_urls)} Short URLs, from {sum(hits.values())} new redirects.")
+
+
+def load_state(now):
+    try:
+        return json.loads(s3.get_object(Bucket=os.environ["HOTSET_BUCKET"], Key=os.environ["STATE_KEY"])["Body"].read())
+    except s3.exceptions.NoSuchKey:
+        # First build: the logs of the last half-life
+        return {"generated_at": now, "logs_until": now - HALF_LIFE_MINUTES * 60, "scores": {}}
+
+
+def count_redirects(logs_until):
+    '''
+    Counts the redirects per Short URL in the log files modified after logs_until; returns them with the last
+    modification time of the files counted, the logs_until of the next build;
+    '''
+    # Log file keys are <prefix><distribution id>.YYYY-MM-DD-HH.<unique id>.gz, by the hour of their requests
+    first_hour = datetime.fromtimestamp(logs_until - LOG_DELIVERY_HOURS * 3600, timezone.utc).strftime("%Y-%m-%d-%H")
+    keys = []
+
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=os.environ["LOG_BUCKET"], Prefix=logs_prefix, StartAfter=logs_prefix + first_hour):
+        for log_file in page.get("Contents", []):
+            modified = int(log_file["LastModified"].timestamp())
+
+            if modified > logs_until:
+                keys.append(log_file["Key"])
+                logs_until = max(logs_until, modified)
+
+    hits = Counter()
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        for file_hits in executor.map(count_file_redirects, keys):
+            hits.update(file_hits)
+
+    return hits, logs_until
+
+
+def count_file_redirects(key):
+    hits = Counter()
+    body = gzip.decompress(s3.get_object(Bucket=os.environ["LOG_BUCKET"], Key=key)["Body"].read())
+
+    for line in body.decode("utf-8").splitlines():
+        if line.startswith("#"):
+            continue
+
+        # cs-uri-stem and sc-status fields of the standard log format
+        fields = line.split("\t")
+        short_url = fields[7].lstrip("/")
+
+        if fields[8] == "301" and short_url and "/" not in short_url:
+            hits[short_url] += 1
+
+    return hits
+
+
+def resolve(short_urls):
+    long_urls = {}
+
+    # BatchGetItem accepts up to 100 keys per call
+    for i in range(0, len(short_urls), 100):
+        keys = [{"short_url": {"S": short_url}} for short_url in short_urls[i:i + 100]]
+
+        while keys:
+            response = ddb.batch_get_item(
+                RequestItems={os.environ["URL_SHORTENER_MAPPING_TABLE"]: {"Keys": keys}}
+            )
+
+            for item in response["Responses"].get(os.environ["URL_SHORTENER_MAPPING_TABLE"], []):
+                # Expiring Short URLs are left to the regional API, the edge redirects are cached regardless of any expiry
+                if "expires_at" not in item:
+                    long_urls[item["short_url"]["S"]] = long_url_of(item)
+
+            keys = response.get("UnprocessedKeys", {}).get(os.environ["URL_SHORTENER_MAPPING_TABLE"], {}).get("Keys", [])
+
+            if keys:
+                sleep(0.1)
+
+    return long_urls
+
+
+def put_json(key, document):
+    s3.put_object(Bucket=os.environ["HOTSET_BUCKET"], Key=key, Body=json.dumps(document), ContentType="application/json")
@@ -0,0 +1,60 @@
+import base64
+from collections import namedtuple
+
+# API Gateway event, reduced to what the Lambda function needs regardless of the payload format version
+Request = namedtuple('Request', ['version', 'method', 'route', 'path', 'headers', 'body', 'client_ip'])
+
+
+def normalize_event(event):
+    ''' 
+    Normalize a REST API (payload format 1.0) or HTTP API (payload format 2.0) proxy event into a Request;
+    header names are lowercased, as HTTP APIs deliver them;
+    '''
+    body = event.get('body')
+
+    if body is not None and event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode()
+
+    if event.get('version') == '2.0':
+        http = event['requestContext']['http']
+        headers = event.get('headers') or {}
+
+        return Request(
+            version='2.0',
+            method=http['method'],
+            route=event['routeKey'].split(' ', 1)[-1],
+            path=event['rawPath'],
+            headers=headers,
+            body=body,
+            client_ip=client_ip(headers, http.get('sourceIp')),
+        )
+
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+
+    return Request(
+        version='1.0',
+        method=event['httpMethod'],
+        route=event['resource'],
+        path=event['path'],
+        headers=headers,
+        body=body,
+        client_ip=client_ip(headers, event.get('requestContext', {}).get('identity', {}).get('sourceIp')),
+    )
+
+
+def client_ip(headers, source_ip):
+    # CloudFront appends the Client IP to the 'X-Forwarded-For' header, the first entry is the client
+    forwarded_for = headers.get('x-forwarded-for')
+
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+
+    return source_ip or ""
+
+
+def format_response(response, request):
+    # HTTP APIs expect an integer status code
+    if request.version == '2.0':
+        return dict(response, statusCode=int(response['statusCode']))
+
+    return response
@@ -0,0 +1,95 @@
+import json
+import queue
+import threading
+from time import time
+from urllib.parse import urlsplit
+
+
+class ClickStream:
+    '''
+    Per-container buffer of the redirects served, sent to the click analytics SQS queue by a background thread,
+    so that counting a click costs an append on the redirect path and never waits on the network;
+    every click is a compact [short_url, epoch seconds, referrer host, country] record and every SQS message
+    a JSON list of up to batch_size records;
+
+    Delivery is best effort: the thread only runs during invocations (the container is frozen in between),
+    and the clicks buffered by a container that's shut down, or that can't be sent, are lost;
+    '''
+    def __init__(self, queue_url, client_factory, batch_size, flush_seconds, max_pending=100):
+        self.queue_url = queue_url
+        self.client_factory = client_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.oldest = 0
+        self.dropped = 0
+
+        # Batches waiting for the background thread, bounded so that a slow or unavailable SQS can't grow the memory
+        self.pending = queue.Queue(max_pending)
+        self.sender = None
+
+    def record(self, short_url, headers):
+        now = time()
+
+        if not self.buffer:
+            self.oldest = now
+
+        self.buffer.append([short_url, int(now), referrer_host(headers.get('referer')), headers.get('cloudfront-viewer-country', '')])
+
+        # A quiet container flushes its clicks on the first redirect after flush_seconds
+        if len(self.buffer) >= self.batch_size or now - self.oldest >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        batch, self.buffer = self.buffer, []
+
+        try:
+            self.pending.put_nowait(batch)
+        except queue.Full:
+            self.dropped += len(batch)
+            print(f"The click analytics queue is falling behind, dropping {len(batch)} clicks ({self.dropped} so far).")
+            return
+
+        # Started on the first flush, so that containers without any redirect never open an SQS connection
+        if self.sender is None:
+            self.sender = threading.Thread(target=self.send_batches, daemon=True)
+            self.sender.start()
+
+    def send_batches(self):
+        client = self.client_factory()
+
+        while True:
+            # Up to 10 pending batches (the SendMessageBatch limit) are sent with a single call
+            batches = [self.pending.get()]
+            while len(batches) < 10 and not self.pending.empty():
+                batches.append(self.pending.get_nowait())
+
+            entries = [{'Id': str(i), 'MessageBody': json.dumps(batch, separators=(',', ':'))} for i, batch in enumerate(batches)]
+
+            try:
+                response = client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+                failed = len(response.get('Failed', []))
+            except Exception as e:
+                print(f"Couldn't send the clicks to SQS, dropping them.\n{e}")
+                failed = len(entries)
+
+            if failed:
+                print(f"{failed} click batches couldn't be sent to SQS and were dropped.")
+
+
+def referrer_host(referrer):
+    # Only the host of the referring page is kept, its path and query string may carry personal data
+    if not referrer:
+        return ''
+
+    try:
+        return urlsplit(referrer).hostname or ''
+    except ValueError:
+        return ''
+
+
+def sqs_client():
+    # Created by the background thread, only botocore is imported as for the DynamoDB client
+    import botocore.session
+
+    return botocore.session.get_session().create_client('sqs')
@@ -0,0 +1,307 @@
+import botocore.session
+from botocore.config import Config
+from hashlib import blake2b
+from time import sleep, time, perf_counter
+from retry_policy import RetryPolicy
+from settings import load_settings
+from url_codec import long_url_of, expires_at_of
+from metrics import Timing
+from api_events import normalize_event, format_response
+
+# Shared by the shorten and unshorten entry points: settings, response headers and the DynamoDB client with its retry policy
+settings = load_settings()
+
+# Response headers are built once per container and shared by every response
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+JSON_HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+# Redirects and 404s are cacheable by browsers (max-age) and CloudFront (s-maxage), failures never are
+REDIRECT_CACHE_CONTROL = f"public, max-age={settings.redirect_max_age}, s-maxage={settings.redirect_s_maxage}"
+NOT_FOUND_HEADERS = dict(CORS_HEADERS, **{'Cache-Control': f"public, max-age={settings.not_found_max_age}, s-maxage={settings.not_found_max_age}"})
+
+def ddb_client_config():
+    '''
+    Timeouts bounding every attempt (the retry policy only retries if another attempt can complete before the
+    invocation deadline), a bigger connection pool and botocore's own retries disabled, so that ddb_helper's
+    retry policy is the single retry authority;
+    '''
+    options = {
+        'connect_timeout': settings.ddb_connect_timeout,
+        'read_timeout': settings.ddb_read_timeout,
+        'max_pool_connections': settings.ddb_max_pool_connections,
+        'retries': {'max_attempts': 0, 'mode': 'standard'},
+    }
+    
+    try:
+        # TCP keep-alive is only supported by recent botocore versions
+        return Config(tcp_keepalive=settings.ddb_tcp_keepalive, **options)
+    except TypeError:
+        return Config(**options)
+
+# Only botocore is imported, boto3's session and resource layers aren't needed for a single low-level client
+ddb = botocore.session.get_session().create_client('dynamodb', config=ddb_client_config())
+
+def dax_client():
+    '''
+    DAX client serving the reads of the mapping table from the cluster's item cache; amazondax is an optional dependency
+    (shipped in a Lambda layer), so the reads stay on DynamoDB if it can't be loaded;
+    '''
+    try:
+        from amazondax import AmazonDaxClient
+        
+        return AmazonDaxClient(endpoints=[settings.dax_endpoint], region_name=ddb.meta.region_name)
+    except Exception as e:
+        print(f"Couldn't create the DAX client, reading from DynamoDB instead.\n{e}")
+        
+        return ddb
+
+# Client of the GET and BATCH_GET reads: DAX when a DAX_ENDPOINT is configured, DynamoDB itself otherwise
+ddb_reader = dax_client() if settings.dax_endpoint else ddb
+
+def read(operation, **kwargs):
+    '''
+    Make a read call with the reader client, falling back to DynamoDB itself when DAX fails,
+    so that an unavailable cluster slows the redirects down rather than failing them;
+    '''
+    if ddb_reader is not ddb:
+        try:
+            return getattr(ddb_reader, operation)(**kwargs)
+        except Exception as e:
+            print(f"Couldn't read through DAX, falling back to DynamoDB.\n{e}")
+    
+    return getattr(ddb, operation)(**kwargs)
+
+def warm_up():
+    '''
+    Open the connection to DynamoDB (or DAX) (credentials, DNS, TCP and TLS handshakes) during the INIT phase,
+    which provisioned concurrency runs ahead of any request, instead of during the first request;
+    '''
+    try:
+        ddb_reader.get_item(TableName=settings.mapping_table, Key={'short_url': {'S': 'warm-up'}})
+    except Exception as e:
+        print(f"Couldn't warm up the DynamoDB connection during INIT.\n{e}")
+
+if settings.warm_up_on_init:
+    warm_up()
+
+# Retry policy shared by every DynamoDB call of this container
+retry_policy = RetryPolicy(settings.backoff, settings.max_backoff, settings.retry_budget, settings.ddb_connect_timeout + settings.ddb_read_timeout)
+
+# Phase durations, counters and properties of the current invocation, emitted once as an EMF log line
+timing = Timing(settings.metrics_namespace)
+
+def handle(event, context, route):
+    '''
+    Body of every entry point (shorten, unshorten and the single function): the invocation's timing and retry
+    deadline are started, the event is normalized, routed and its response formatted back for the API;
+    '''
+    timing.start()
+    retry_policy.start_invocation(context)
+    
+    # REST API (payload format 1.0) and HTTP API (payload format 2.0) events are handled alike
+    started = perf_counter()
+    request = normalize_event(event)
+    timing.record('parse', started)
+    
+    result = route(request)
+    
+    # A single EMF log line per invocation, carrying the status of the response
+    timing.set(status=result['statusCode'])
+    timing.emit()
+    
+    return format_response(result, request)
+
+def redirect_response(long_url, expires_at=0):
+    # Return the Long URL as a redirect request, a 404 if the Short URL is unknown, or a 410 if it has expired
+    if long_url is None:
+        return {
+            'statusCode': '404',
+            'headers': NOT_FOUND_HEADERS
+        }
+    
+    cache_control = REDIRECT_CACHE_CONTROL
+    
+    if expires_at:
+        # DynamoDB deletes expired items up to days later, so the expiry is checked on every read
+        remaining = expires_at - int(time())
+        
+        # Cached like a 404, as the Short URL becomes free again once the item is deleted
+        if remaining <= 0:
+            return {
+                'statusCode': '410',
+                'headers': NOT_FOUND_HEADERS
+            }
+        
+        # Neither browsers nor CloudFront may keep the redirect past the expiry
+        cache_control = f"public, max-age={min(settings.redirect_max_age, remaining)}, s-maxage={min(settings.redirect_s_maxage, remaining)}"
+    
+    return {
+        'statusCode': '301',
+        'headers': {
+            'Location': long_url,
+            'Cache-Control': cache_control,
+            'Access-Control-Allow-Origin': '*' 
+        }
+    }
+    
+def ddb_helper(method, payload=None):
+    # Every DynamoDB API is timed as a phase of its own (ex: ddb_put), retries included
+    started = perf_counter()
+    result = ddb_attempts(method, payload)
+    timing.record('ddb_' + method.lower(), started)
+    
+    return result
+    
+def ddb_attempts(method, payload):
+    for num_retry in range(settings.max_retries):
+        timing.count('ddb_calls')
+        
+        try:
+            result = ddb_call(method, payload)
+            
+            if result is not None:
+                retry_policy.record_success()
+                return result
+            
+            error_class, error = 'transient', "DynamoDB returned an unexpected HTTP status code"
+        
+        except Exception as e:
+            error_class, error = retry_policy.classify(e), e
+        
+        # The Short URL already exists, retrying the same PUT can't succeed
+        if error_class == 'conflict' and method == "PUT":
+            return {
+                'statusCode': '409',
+                'headers': CORS_HEADERS
+            }
+        
+        # Some of the Short URLs already exist, return their positions so that only those are regenerated
+        if error_class == 'conflict' and method == "TRANSACT_PUT":
+            return [[i for i, reason in enumerate(error.response.get('CancellationReasons', [])) if reason.get('Code') == 'ConditionalCheckFailed'], None]
+        
+        # Jittered exponential backoff, as long as the error is retryable and the deadline and retry budget allow it
+        delay = retry_policy.backoff(num_retry)
+        
+        if num_retry + 1 == settings.max_retries or not retry_policy.allow_retry(error_class, delay):
+            print(f"Encountered the below {error_class} error during DynamoDB {method} API. Not retrying..\n{error}")
+            break
+        
+        print(f"Encountered the below {error_class} error during DynamoDB {method} API. Retrying in {delay * 1000:.0f}ms..\n{error}")
+        timing.count('retries')
+        sleep(delay)
+            
+    print(f"Couldn't complete the request after {num_retry + 1} attempts. Returning HTTP 500 back to the client.")
+        
+    failure = {
+        'statusCode': '500',
+        'headers': CORS_HEADERS
+    }
+    
+    if method in ("GET", "UPDATE", "QUERY", "TRANSACT_PUT", "BATCH_GET"):
+        return [None, failure]
+    
+    return failure
+    
+def ddb_call(method, payload):
+    '''
+    Make a single DynamoDB API call for the given method, without any retries;
+    returns None when the response isn't usable and the call should be retried;
+    '''
+    if method == "PUT":
+        # Only store the mapping if the Short URL isn't taken yet
+        response = ddb.put_item(
+            TableName=settings.mapping_table,
+            Item=payload,
+            ConditionExpression="attribute_not_exists(short_url)"
+        )
+        
+        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
+            return {
+                'statusCode': '200',
+                'headers': JSON_HEADERS
+            }
+    
+    if method == "GET":
+        response = read(
+            'get_item',
+            TableName=settings.mapping_table,
+            Key=payload
+        )
+        
+        # If DDB response is empty, the Short URL is unknown
+        if 'Item' not in response:
+            return [None, None]
+        
+        # Return the Long URL and the expiry of the Short URL in the form of [success, failure]
+        return [(long_url_of(response['Item']), expires_at_of(response['Item'])), None]
+    
+    if method == "TRANSACT_PUT":
+        # Store every mapping or none of them, each only if its Short URL isn't taken yet
+        response = ddb.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': settings.mapping_table,
+                        'Item': item,
+                        'ConditionExpression': "attribute_not_exists(short_url)"
+                    }
+                }
+                for item in payload
+            ],
+            # The same token on every attempt: if an attempt timed out after DynamoDB committed the transaction,
+            # the retry succeeds without writing anything, rather than being cancelled on every (now taken) Short URL
+            ClientRequestToken=blake2b(repr(payload).encode(), digest_size=18).hexdigest()
+        )
+        
+        # No Short URL was taken, in the form of [success, failure]
+        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
+            return [[], None]
+    
+    if method == "BATCH_GET":
+        response = read(
+            'batch_get_item',
+            RequestItems={
+                settings.mapping_table: {
+                    'Keys': payload
+                }
+            }
+        )
+        
+        table = settings.mapping_table
+        
+        # Return the items found and the unprocessed keys in the form of [success, failure]
+        return [[response['Responses'].get(table, []), response.get('UnprocessedKeys', {}).get(table, {}).get('Keys', [])], None]
+    
+    if method == "QUERY":
+        # Look up the Short URLs already stored for the given Long URL digest
+        response = ddb.query(
+            TableName=settings.mapping_table,
+            IndexName=settings.dedupe_index,
+            KeyConditionExpression="long_url_hash = :h",
+            ExpressionAttributeValues={
+                ':h': {"S": payload}
+            },
+            Limit=1
+        )
+        
+        # Return the matching Short URLs in the form of [success, failure]
+        return [[item['short_url']['S'] for item in response['Items']], None]
+    
+    if method == "UPDATE":
+        # Increment the atomic counter (or one of its shards) by the block size and return its updated value
+        response = ddb.update_item(
+            TableName=settings.counter_table,
+            Key={
+                "id": {
+                    "S": f"counter#{payload['shard']}" if settings.counter_shards > 1 else "counter"
+                }
+            },
+            UpdateExpression="ADD val :q",
+            ExpressionAttributeValues={
+                ':q': {"N": str(payload['size'])}
+            },
+            ReturnValues="UPDATED_NEW"
+        )
+        
+        # Return the counter value in the form of [success, failure] 
+        return [response['Attributes']['val']['N'], None]
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from time import monotonic
+
+# Returned by LRUCache.get when the key isn't cached (None is a valid, negative, cached value)
+MISS = object()
+
+
+class LRUCache:
+    ''' 
+    Bounded in-process LRU cache with a TTL per entry;
+    a value of None is a negative entry (ex: a 404) and expires after the shorter negative TTL;
+    '''
+    def __init__(self, max_size, ttl, negative_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+
+        if entry is None or entry[1] <= monotonic():
+            self.stats['misses'] += 1
+            return MISS
+
+        # Mark the entry as the most recently used one
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+
+        return entry[0]
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self.entries[key] = (value, monotonic() + ttl)
+        self.entries.move_to_end(key)
+
+        # Evict the least recently used entries once the cache is full
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def metrics(self):
+        return dict(self.stats, size=len(self.entries))
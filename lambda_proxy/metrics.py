@@ -0,0 +1,50 @@
+import json
+from time import perf_counter, time
+
+class Timing:
+    '''
+    Per-invocation record of phase durations, counters (DynamoDB calls, retries, cache hits) and properties
+    (action, status, Short URL), written once per invocation as a single CloudWatch Embedded Metric Format log line,
+    from which CloudWatch builds the metrics without any API call; recording a phase costs a perf_counter call and
+    a dict update, so that the instrumentation stays well under a microsecond per phase;
+    '''
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.start()
+
+    def start(self):
+        # Reset at the beginning of every invocation, as the container is reused
+        self.started = perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self.properties = {'action': 'unknown'}
+
+    def record(self, phase, started):
+        # Milliseconds since started (a perf_counter value) are added, as a phase can run several times per invocation
+        self.durations[phase] = self.durations.get(phase, 0.0) + (perf_counter() - started) * 1000
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def set(self, **properties):
+        self.properties.update(properties)
+
+    def emit(self):
+        self.durations['total'] = (perf_counter() - self.started) * 1000
+
+        metrics = [{'Name': name, 'Unit': 'Milliseconds'} for name in self.durations]
+        metrics += [{'Name': name, 'Unit': 'Count'} for name in self.counts]
+
+        record = dict(self.properties, **self.durations, **self.counts)
+        record['_aws'] = {
+            'Timestamp': int(time() * 1000),
+            'CloudWatchMetrics': [
+                {
+                    'Namespace': self.namespace,
+                    'Dimensions': [['action']],
+                    'Metrics': metrics
+                }
+            ]
+        }
+
+        print(json.dumps(record))
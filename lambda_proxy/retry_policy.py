@@ -0,0 +1,109 @@
+import random
+from time import monotonic
+
+# DynamoDB error codes grouped by how a retry is expected to fare
+THROTTLING_ERRORS = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TransactionConflictException',
+}
+TRANSIENT_ERRORS = {
+    'InternalServerError',
+    'InternalFailure',
+    'ServiceUnavailable',
+    # A retry of a transaction (same ClientRequestToken) that's still being processed
+    'TransactionInProgressException',
+}
+CONFLICT_ERRORS = {
+    'ConditionalCheckFailedException',
+}
+
+# botocore errors raised without any DynamoDB response, only those of the connection itself are worth a retry;
+# client-side validation, credentials and region errors fail the same way every time
+CONNECTION_ERRORS = {
+    'EndpointConnectionError',
+    'ConnectionClosedError',
+}
+
+# Reasons a transaction item was cancelled for, mapped to the error class of the whole transaction
+CANCELLATION_REASONS = {
+    'ConditionalCheckFailed': 'conflict',
+    'ProvisionedThroughputExceeded': 'throttle',
+    'ThrottlingError': 'throttle',
+    'TransactionConflict': 'throttle',
+}
+
+# Retry budget tokens consumed per retry of each error class (timeouts are the most expensive, as in the AWS SDKs)
+RETRY_COSTS = {'throttle': 5, 'transient': 5, 'timeout': 10}
+
+
+class RetryPolicy:
+    ''' 
+    Decides whether and when a failed DynamoDB call is retried: errors are classified, retries back off
+    exponentially with full jitter, are only made if the attempt (which takes up to attempt_timeout seconds)
+    can complete before the invocation deadline, and draw from a container-wide token bucket (refilled by
+    successful calls) so that a DynamoDB brownout doesn't multiply the load;
+    '''
+    def __init__(self, base_ms, cap_ms, budget, attempt_timeout=0, deadline_margin_ms=500):
+        self.base = base_ms / 1000
+        self.cap = cap_ms / 1000
+        self.attempt_timeout = attempt_timeout
+        self.capacity = budget
+        self.tokens = budget
+        self.deadline_margin = deadline_margin_ms / 1000
+        self.deadline = None
+
+    def start_invocation(self, context):
+        # Retries must finish before Lambda times out the invocation
+        self.deadline = None
+        if context is not None:
+            self.deadline = monotonic() + context.get_remaining_time_in_millis() / 1000 - self.deadline_margin
+
+    def classify(self, error):
+        # botocore's ClientError carries the DynamoDB error code, the other botocore errors have none
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+        if code in CONFLICT_ERRORS:
+            return 'conflict'
+        if code == 'TransactionCanceledException':
+            # A taken key is reported first, as the other items of the transaction can be retried as they are
+            reasons = {CANCELLATION_REASONS.get(reason.get('Code')) for reason in error.response.get('CancellationReasons', [])}
+            return next((error_class for error_class in ('conflict', 'throttle') if error_class in reasons), 'fatal')
+        if code in THROTTLING_ERRORS:
+            return 'throttle'
+        if code in TRANSIENT_ERRORS:
+            return 'transient'
+        if code is None:
+            # Matched by name along the class hierarchy (ex: ConnectTimeoutError is an EndpointConnectionError),
+            # so that botocore's exceptions don't have to be imported
+            names = {cls.__name__ for cls in type(error).__mro__}
+
+            if any(name.endswith('TimeoutError') for name in names):
+                return 'timeout'
+            if names & CONNECTION_ERRORS:
+                return 'transient'
+
+        # Validation, access and any other (programming) errors fail the same way when retried
+        return 'fatal'
+
+    def backoff(self, num_retry):
+        # Full jitter: a random delay up to the capped exponential backoff
+        return random.uniform(0, min(self.cap, self.base * 2 ** num_retry))
+
+    def allow_retry(self, error_class, delay):
+        if error_class not in RETRY_COSTS:
+            return False
+
+        # A retry that could still be waiting on DynamoDB when Lambda times out would turn a 500 into a 502
+        if self.deadline is not None and monotonic() + delay + self.attempt_timeout > self.deadline:
+            return False
+
+        if self.tokens < RETRY_COSTS[error_class]:
+            return False
+
+        self.tokens -= RETRY_COSTS[error_class]
+        return True
+
+    def record_success(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
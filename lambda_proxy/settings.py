@@ -0,0 +1,79 @@
+import os
+from collections import namedtuple
+
+# Configuration of the Lambda function, parsed once per container from its environment variables;
+# an immutable namedtuple rather than a dataclass, as importing dataclasses noticeably slows down cold starts
+Settings = namedtuple('Settings', [
+    'max_retries',
+    'backoff',
+    'max_backoff',
+    'retry_budget',
+    'hash_digest_size',
+    'mapping_table',
+    'counter_table',
+    'dedupe_index',
+    'id_generator',
+    'counter_block_size',
+    'counter_shards',
+    'counter_shard_selection',
+    'cache_size',
+    'cache_ttl',
+    'cache_negative_ttl',
+    'dedupe',
+    'batch_max_urls',
+    'ddb_connect_timeout',
+    'ddb_read_timeout',
+    'ddb_max_pool_connections',
+    'ddb_tcp_keepalive',
+    'redirect_max_age',
+    'redirect_s_maxage',
+    'not_found_max_age',
+    'warm_up_on_init',
+    'dax_endpoint',
+    'url_encoding',
+    'code_alphabet',
+    'code_length',
+    'metrics_namespace',
+    'clicks_queue_url',
+    'click_batch_size',
+    'click_flush_seconds',
+])
+
+
+
+def load_settings(environ=os.environ):
+    return Settings(
+        max_retries=int(environ['MAX_RETRIES']),
+        backoff=int(environ['BACKOFF']),
+        max_backoff=int(environ.get('MAX_BACKOFF', '1000')),
+        retry_budget=int(environ.get('RETRY_BUDGET', '500')),
+        hash_digest_size=int(environ['HASH_DIGEST_SIZE']),
+        mapping_table=environ['URL_SHORTENER_MAPPING_TABLE'],
+        counter_table=environ.get('URL_SHORTENER_COUNTER_TABLE', ''),
+        dedupe_index=environ.get('URL_SHORTENER_DEDUPE_INDEX', ''),
+        id_generator=environ.get('ID_GENERATOR', 'counter'),
+        counter_block_size=int(environ.get('COUNTER_BLOCK_SIZE', '1')),
+        counter_shards=int(environ.get('COUNTER_SHARDS', '1')),
+        counter_shard_selection=environ.get('COUNTER_SHARD_SELECTION', 'container'),
+        cache_size=int(environ.get('CACHE_SIZE', '0')),
+        cache_ttl=int(environ.get('CACHE_TTL', '300')),
+        cache_negative_ttl=int(environ.get('CACHE_NEGATIVE_TTL', '5')),
+        dedupe=environ.get('DEDUPE', 'false') == 'true',
+        batch_max_urls=int(environ.get('BATCH_MAX_URLS', '500')),
+        ddb_connect_timeout=float(environ.get('DDB_CONNECT_TIMEOUT', '1')),
+        ddb_read_timeout=float(environ.get('DDB_READ_TIMEOUT', '2')),
+        ddb_max_pool_connections=int(environ.get('DDB_MAX_POOL_CONNECTIONS', '10')),
+        ddb_tcp_keepalive=environ.get('DDB_TCP_KEEPALIVE', 'true') == 'true',
+        redirect_max_age=int(environ.get('REDIRECT_MAX_AGE', '0')),
+        redirect_s_maxage=int(environ.get('REDIRECT_S_MAXAGE', '0')),
+        not_found_max_age=int(environ.get('NOT_FOUND_MAX_AGE', '0')),
+        warm_up_on_init=environ.get('WARM_UP_ON_INIT', 'false') == 'true',
+        dax_endpoint=environ.get('DAX_ENDPOINT', ''),
+        url_encoding=environ.get('URL_ENCODING', 'plain'),
+        code_alphabet=environ.get('CODE_ALPHABET', 'hex'),
+        code_length=int(environ.get('CODE_LENGTH', '0')),
+        metrics_namespace=environ.get('METRICS_NAMESPACE', 'UrlShortener'),
+        clicks_queue_url=environ.get('CLICKS_QUEUE_URL', ''),
+        click_batch_size=int(environ.get('CLICK_BATCH_SIZE', '100')),
+        click_flush_seconds=float(environ.get('CLICK_FLUSH_SECONDS', '10')),
+    )
@@ -0,0 +1,35 @@
+import math
+
+# Alphabets a Short URL code can be written with; base58 leaves out the look-alike 0/O and I/l,
+# Crockford's base32 leaves out I, L, O and U
+ALPHABETS = {
+    'hex': '0123456789abcdef',
+    'base62': '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz',
+    'base58': '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz',
+    'base32': '0123456789ABCDEFGHJKMNPQRSTVWXYZ',
+}
+
+def code_width(digest_size, alphabet):
+    # Characters needed to write any digest of digest_size bytes, so that every code has the same length
+    return math.ceil(digest_size * 8 / math.log2(len(ALPHABETS[alphabet])))
+
+def encode_code(digest, alphabet='hex', length=0):
+    '''
+    Write the hash digest as a Short URL code in the given alphabet, left-padded to a fixed width;
+    a length (0 for the full width) keeps only the last characters, trading entropy for shorter codes
+    (the leading characters of a padded code don't use the whole alphabet, the trailing ones do), and so for
+    more collisions, which the conditional writes of both the single and the batch shorten APIs regenerate;
+    '''
+    if alphabet == 'hex':
+        code = digest.hex()
+    else:
+        symbols = ALPHABETS[alphabet]
+        base, value, chars = len(symbols), int.from_bytes(digest, 'big'), []
+
+        for _ in range(code_width(len(digest), alphabet)):
+            value, remainder = divmod(value, base)
+            chars.append(symbols[remainder])
+
+        code = ''.join(reversed(chars))
+
+    return code[-length:] if length else code
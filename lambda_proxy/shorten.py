@@ -0,0 +1,356 @@
+import os
+import json
+import random
+from time import time, perf_counter
+from common import settings, timing, handle, ddb_helper, CORS_HEADERS, JSON_HEADERS
+from url_codec import mapping_item, long_url_digest
+from short_codes import encode_code
+from hashlib import blake2b
+
+# Block of global counter values leased by this container, handed out locally until exhausted
+counter_block = {'shard': random.randrange(settings.counter_shards), 'next': 0, 'end': 0}
+
+# Identity of this container and its sequence, used by the counter-free "snowflake" ID generator
+snowflake = {'container_id': os.urandom(16).hex(), 'seq': 0}
+
+# Mappings per TransactWriteItems call (up to 100): a taken Short URL or a throttled item cancels the whole
+# transaction, whose other items are written again, so smaller transactions waste fewer (doubled) WCUs
+TRANSACTION_SIZE = 25
+
+def lambda_handler(event, context):
+    return handle(event, context, route)
+    
+def route(request):
+    started = perf_counter()
+    body = json.loads(request.body)
+    timing.record('parse', started)
+    
+    if not isinstance(body, dict):
+        return {
+            'statusCode': '400',
+            'headers': JSON_HEADERS,
+            'body': json.dumps({"error": "The request body must be a JSON object"})
+        }
+    
+    cdn_prefix = body['cdn_prefix']
+    
+    # Optional expiry of the Short URL(s), as expires_in seconds from now or an expires_at epoch timestamp
+    res = expiry_of(body)
+    
+    if res[1]:
+        return res[1]
+    
+    # Shorten up to BATCH_MAX_URLS long URLs at once
+    if request.route == '/shorten/batch':
+        if not isinstance(body.get('urls'), list) or not 0 < len(body['urls']) <= settings.batch_max_urls:
+            return {
+                'statusCode': '400',
+                'headers': JSON_HEADERS,
+                'body': json.dumps({"error": f"urls must be a list of 1 to {settings.batch_max_urls} long URLs"})
+            }
+        
+        return shorten_batch(body['urls'], cdn_prefix, request.client_ip, res[0])
+    
+    long_url = body['url_long']
+    
+    # Shorten the long URL
+    return shorten(long_url, cdn_prefix, request.client_ip, res[0])
+    
+def expiry_of(body):
+    '''
+    Return the expiry (epoch seconds, 0 if the Short URL never expires) requested with either expires_in or expires_at
+    in the form of [success, failure];
+    '''
+    expires_in, expires_at = body.get('expires_in'), body.get('expires_at')
+    
+    if expires_in is None and expires_at is None:
+        return [0, None]
+    
+    now = int(time())
+    value = expires_in if expires_at is None else expires_at
+    
+    # Exactly one of them, as an integer (JSON booleans are ints in Python), and in the future
+    valid = (expires_in is None or expires_at is None) and isinstance(value, int) and not isinstance(value, bool)
+    
+    if valid:
+        expires_at = now + value if expires_at is None else value
+    
+    if not valid or expires_at <= now:
+        return [None, {
+            'statusCode': '400',
+            'headers': JSON_HEADERS,
+            'body': json.dumps({"error": "Either expires_in (seconds) or expires_at (epoch seconds in the future) can be given, as an integer"})
+        }]
+    
+    return [expires_at, None]
+    
+def shorten(long_url, cdn_prefix, client_ip, expires_at=0):
+    timing.set(action='shorten')
+    
+    # An expiring Short URL is never shared, the Long URL may have been shortened for longer (or for good) before
+    if settings.dedupe and not expires_at:
+        # Look for the Short URL of an earlier request with the same Long URL
+        res = ddb_helper("QUERY", long_url_digest(long_url))
+        
+        if res[1]:
+            return res[1]
+        
+        # The Long URL was shortened before, return its existing Short URL without any write
+        if res[0]:
+            timing.count('dedupe_hits')
+            
+            return {
+                'statusCode': '200',
+                'headers': JSON_HEADERS,
+                'body': json.dumps(
+                    {
+                        "url_long": long_url,
+                        "url_short": cdn_prefix + "/" + res[0][0]
+                    }
+                )
+            }
+    
+    for num_attempt in range(settings.max_retries):
+        # Get a unique value from the configured ID generator (ddb_update, when a counter block is leased, is part of it)
+        started = perf_counter()
+        res = next_unique_ids()
+        timing.record('unique_id', started)
+        
+        if not res[0]:
+            return res[1]
+        
+        started = perf_counter()
+        short_url = hash_url(long_url, client_ip, res[0][0])
+        payload = mapping_item(short_url, long_url, settings.url_encoding, settings.dedupe, expires_at)
+        timing.record('hash', started)
+        
+        # Store the Long and Short URL in the DDB table, unless the Short URL is already taken
+        result = ddb_helper("PUT", payload)
+        
+        # On a hash collision, regenerate the Short URL from a fresh unique value
+        if result['statusCode'] != '409':
+            break
+        
+        print(f"Short URL {short_url} is already taken. Regenerating..")
+        timing.count('collisions')
+    
+    else:
+        print(f"Couldn't generate a free Short URL after {settings.max_retries} attempts. Returning HTTP 500 back to the client.")
+        
+        return {
+            'statusCode': '500',
+            'headers': CORS_HEADERS
+        }
+    
+    # If DDB PUT is successful, return the Long and Short URL (and the expiry, if any) back to the client
+    if result['statusCode'] == '200':
+        response = {
+            "url_long": long_url,
+            "url_short": cdn_prefix + "/" + short_url
+        }
+        
+        if expires_at:
+            response['expires_at'] = expires_at
+        
+        result['body'] = json.dumps(response)
+    
+    return result
+    
+def shorten_batch(long_urls, cdn_prefix, client_ip, expires_at=0):
+    '''
+    Shorten many Long URLs at once: the unique values are allocated in one go and the mappings are written
+    with TransactWriteItems, each only if its Short URL isn't taken yet; the results keep the input order
+    and report per-item failures; the expiry, if any, applies to the whole batch;
+    '''
+    timing.set(action='shorten_batch')
+    timing.count('urls', len(long_urls))
+    results, valid = [], []
+    
+    for long_url in long_urls:
+        result = {"url_long": long_url}
+        results.append(result)
+        
+        if isinstance(long_url, str) and long_url:
+            valid.append(result)
+        else:
+            result['error'] = "url_long must be a non-empty string"
+    
+    pending, repeats = valid, []
+    
+    # As for a single Long URL, an expiring Short URL is never shared
+    if settings.dedupe and not expires_at:
+        pending, repeats = dedupe_batch(valid)
+    
+    store_batch(pending, client_ip, expires_at)
+    
+    # A Long URL repeated in the batch gets the Short URL (or the error) of its first occurrence
+    for result, first in repeats:
+        result.update((key, first[key]) for key in ('url_short', 'error') if key in first)
+    
+    for result in valid:
+        if 'url_short' in result:
+            result['url_short'] = cdn_prefix + "/" + result['url_short']
+    
+    response = {"results": results}
+    
+    if expires_at:
+        response['expires_at'] = expires_at
+    
+    return {
+        'statusCode': '200',
+        'headers': JSON_HEADERS,
+        'body': json.dumps(response)
+    }
+    
+def dedupe_batch(results):
+    '''
+    Look the Long URLs of the batch up in the dedupe index (one Query per distinct Long URL), the ones shortened
+    before get their existing Short URL; returns the results left to shorten and the (result, first occurrence)
+    pairs of the Long URLs repeated within the batch;
+    '''
+    first, pending, repeats = {}, [], []
+    
+    for result in results:
+        long_url = result['url_long']
+        
+        if long_url in first:
+            repeats.append((result, first[long_url]))
+            continue
+        
+        first[long_url] = result
+        res = ddb_helper("QUERY", long_url_digest(long_url))
+        
+        if res[1]:
+            result['error'] = "Couldn't look up the Long URL, please retry"
+        elif res[0]:
+            timing.count('dedupe_hits')
+            result['url_short'] = res[0][0]
+        else:
+            pending.append(result)
+    
+    return pending, repeats
+    
+def store_batch(results, client_ip, expires_at):
+    '''
+    Generate and store the Short URLs of the results, setting either their url_short or an error; a code repeated
+    within the batch is regenerated before the write (a transaction can't write the same item twice), and a code
+    already taken in the table is regenerated once the transaction is cancelled, as shorten() does on a 409;
+    '''
+    taken, unnamed, named = set(), list(results), []
+    
+    for num_attempt in range(settings.max_retries):
+        if unnamed:
+            # Allocate the unique values of every result still without a Short URL at once
+            started = perf_counter()
+            res = next_unique_ids(len(unnamed))
+            timing.record('unique_id', started)
+            
+            values, collisions = res[0] or [], []
+            
+            if not res[0]:
+                for result in unnamed:
+                    result['error'] = "Couldn't allocate a unique value, please retry"
+            
+            started = perf_counter()
+            for result, unique_value in zip(unnamed, values):
+                short_url = hash_url(result['url_long'], client_ip, unique_value)
+                
+                if short_url in taken:
+                    collisions.append(result)
+                    timing.count('collisions')
+                else:
+                    taken.add(short_url)
+                    result['url_short'] = short_url
+                    named.append(result)
+            timing.record('hash', started)
+            
+            unnamed = collisions
+        
+        chunks, named = [named[i:i + TRANSACTION_SIZE] for i in range(0, len(named), TRANSACTION_SIZE)], []
+        
+        for chunk in chunks:
+            res = ddb_helper("TRANSACT_PUT", [mapping_item(result['url_short'], result['url_long'], settings.url_encoding, settings.dedupe, expires_at) for result in chunk])
+            
+            if res[1]:
+                for result in chunk:
+                    result['error'] = "Couldn't store the Short URL, please retry"
+                    del result['url_short']
+                continue
+            
+            # The transaction was cancelled and wrote nothing: the taken Short URLs are regenerated,
+            # the others are written again as they are
+            for position in res[0]:
+                print(f"Short URL {chunk[position]['url_short']} is already taken. Regenerating..")
+                timing.count('collisions')
+                unnamed.append(chunk[position])
+                del chunk[position]['url_short']
+            
+            if res[0]:
+                named += [result for result in chunk if 'url_short' in result]
+        
+        if not unnamed and not named:
+            return
+    
+    print(f"Couldn't generate a free Short URL for {len(unnamed) + len(named)} Long URLs after {settings.max_retries} attempts.")
+    
+    for result in unnamed + named:
+        result.pop('url_short', None)
+        result['error'] = "Couldn't generate a free Short URL, please retry"
+    
+def hash_url(long_url, client_ip, unique_value):
+    ''' 
+    Initialize blake2b hashing with a custom digest size;
+    salt and personalization are added for more randomized hashing;
+    the digest is written in the CODE_ALPHABET alphabet, optionally cut down to CODE_LENGTH characters;
+    '''
+    h = blake2b(digest_size=settings.hash_digest_size, salt=long_url[:16].encode(), person=client_ip.encode())
+    
+    # Use the unique value to generate randomized hash value    
+    h.update(unique_value.encode())
+    
+    return encode_code(h.digest(), settings.code_alphabet, settings.code_length)
+    
+def next_unique_ids(count=1):
+    '''
+    Return a list of count unique values in the form of [success, failure], either from the global counter
+    or, in "snowflake" mode, from the timestamp, the container ID and a per-container sequence;
+    '''
+    if settings.id_generator != 'snowflake':
+        return next_counters(count)
+    
+    timestamp = int(time() * 1000)
+    snowflake['seq'] += count
+    
+    return [[f"{timestamp}.{snowflake['container_id']}.{seq}" for seq in range(snowflake['seq'] - count + 1, snowflake['seq'] + 1)], None]
+    
+def next_counters(count=1):
+    '''
+    Hand out the next count contiguous values from the counter block leased by this container;
+    a new block of at least COUNTER_BLOCK_SIZE values is leased from DDB only once the current one can't serve the request;
+    '''
+    if counter_block['end'] - counter_block['next'] < count:
+        # Either stick to the shard picked for this container or spread every lease across the shards
+        shard = counter_block['shard']
+        if settings.counter_shard_selection == 'request':
+            shard = random.randrange(settings.counter_shards)
+        
+        size = max(count, settings.counter_block_size)
+        res = ddb_helper("UPDATE", {'shard': shard, 'size': size})
+        
+        if not res[0]:
+            return res
+        
+        # DDB returns the upper bound of the lease, so the values (end - size, end] belong to this container
+        counter_block['shard'] = shard
+        counter_block['end'] = int(res[0])
+        counter_block['next'] = counter_block['end'] - size
+    
+    counter_block['next'] += count
+    values = [str(value) for value in range(counter_block['next'] - count + 1, counter_block['next'] + 1)]
+    
+    # Every shard counts independently, so the shard index is folded into the value to keep it globally unique
+    if settings.counter_shards > 1:
+        values = [f"{counter_block['shard']}#{value}" for value in values]
+    
+    # Return the counter values in the form of [success, failure]
+    return [values, None]
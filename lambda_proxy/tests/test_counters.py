@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# The bench helpers import the Lambda function with a test environment and provide the in-memory DynamoDB stand-in
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb, configure
+from fake_ddb import FakeDynamoDB
+
+shorten = load_lambda("shorten")
+COUNTER_TABLE = shorten.settings.counter_table
+
+
+class TestNextCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeDynamoDB()
+        use_ddb(self.fake)
+        configure(counter_shards=4, counter_block_size=10, counter_shard_selection="container")
+        shorten.counter_block.update(shard=2, next=0, end=0)
+
+    def tearDown(self):
+        configure(counter_shards=1, counter_block_size=1, counter_shard_selection="container")
+
+    def counter(self, key):
+        return int(self.fake.tables[COUNTER_TABLE][key]["val"]["N"])
+
+    def test_container_shard_key(self):
+        shorten.next_counters()
+        self.assertEqual(list(self.fake.tables[COUNTER_TABLE]), ["counter#2"])
+
+    def test_single_counter_key(self):
+        configure(counter_shards=1)
+        shorten.next_counters()
+        self.assertEqual(list(self.fake.tables[COUNTER_TABLE]), ["counter"])
+
+    def test_request_shard_selection(self):
+        configure(counter_shard_selection="request")
+        with patch.object(shorten.random, "randrange", return_value=3):
+            values, failure = shorten.next_counters()
+
+        self.assertIsNone(failure)
+        self.assertEqual(values, ["3#1"])
+        self.assertEqual(shorten.counter_block["shard"], 3)
+
+    def test_shard_folded_into_values(self):
+        values, failure = shorten.next_counters(3)
+        self.assertIsNone(failure)
+        self.assertEqual(values, ["2#1", "2#2", "2#3"])
+
+    def test_lease_bounds(self):
+        # Another container already leased (90, 100], this one gets (100, 110]
+        self.fake.update_item(TableName=COUNTER_TABLE, Key={"id": {"S": "counter#2"}}, UpdateExpression="ADD val :q", ExpressionAttributeValues={":q": {"N": "100"}})
+
+        values, _ = shorten.next_counters(3)
+        self.assertEqual(values, ["2#101", "2#102", "2#103"])
+        self.assertEqual((shorten.counter_block["next"], shorten.counter_block["end"]), (103, 110))
+        self.assertEqual(self.counter("counter#2"), 110)
+
+    def test_block_served_locally(self):
+        for _ in range(10):
+            shorten.next_counters()
+
+        self.assertEqual(self.fake.calls["update_item"], 1)
+
+    def test_release_on_exhaustion(self):
+        shorten.next_counters(8)
+
+        # Only 2 values are left, so a new block is leased and the rest of the old one is skipped
+        values, _ = shorten.next_counters(5)
+        self.assertEqual(values, [f"2#{value}" for value in range(11, 16)])
+        self.assertEqual(self.fake.calls["update_item"], 2)
+        self.assertEqual(self.counter("counter#2"), 20)
+
+    def test_lease_larger_than_block(self):
+        values, _ = shorten.next_counters(25)
+        self.assertEqual(len(values), 25)
+        self.assertEqual(self.counter("counter#2"), 25)
+        self.assertEqual(shorten.counter_block["end"] - shorten.counter_block["next"], 0)
+
+    def test_lease_failure(self):
+        # A response without the counter value isn't usable
+        self.fake.update_item = lambda **kwargs: {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+        values, failure = shorten.next_counters()
+        self.assertIsNone(values)
+        self.assertEqual(failure["statusCode"], "500")
+        self.assertEqual(shorten.counter_block["end"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
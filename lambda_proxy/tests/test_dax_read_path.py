@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb
+from fake_ddb import FakeDynamoDB, FakeDax
+
+unshorten = load_lambda("unshorten")
+import common  # noqa: E402
+
+MAPPING_TABLE = common.settings.mapping_table
+
+
+class TestDaxReadPath(unittest.TestCase):
+
+    def setUp(self):
+        self.ddb = FakeDynamoDB()
+        self.ddb.put_item(TableName=MAPPING_TABLE, Item={"short_url": {"S": "abc"}, "long_url": {"S": "https://example.com"}})
+        self.ddb.calls.clear()
+
+        # The module globals are restored for the test modules that run next in the same process
+        for patcher in [patch.object(unshorten, "url_cache", unshorten.LRUCache(0, 300, 5)), patch.object(common, "ddb", common.ddb), patch.object(common, "ddb_reader", common.ddb_reader)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use_dax(self, available):
+        self.dax = FakeDax(self.ddb, available=available)
+        use_ddb(self.ddb, self.dax)
+
+    def test_reads_served_by_dax(self):
+        self.use_dax(True)
+
+        self.assertEqual(unshorten.unshorten("abc")["headers"]["Location"], "https://example.com")
+        self.assertEqual(self.dax.calls, {"get_item": 1})
+        self.assertEqual(self.ddb.calls, {})
+
+    def test_batch_reads_served_by_dax(self):
+        self.use_dax(True)
+
+        found, unprocessed = unshorten.batch_get(["abc", "missing"])
+        self.assertEqual(found, {"abc": ("https://example.com", 0)})
+        self.assertEqual(unprocessed, set())
+        self.assertEqual(self.dax.calls, {"batch_get_item": 1})
+
+    def test_unavailable_cluster_falls_back_to_dynamodb(self):
+        self.use_dax(False)
+
+        self.assertEqual(unshorten.unshorten("abc")["headers"]["Location"], "https://example.com")
+        self.assertEqual(unshorten.unshorten("missing")["statusCode"], "404")
+        self.assertEqual(self.ddb.calls, {"get_item": 2})
+
+    def test_writes_never_go_through_dax(self):
+        self.use_dax(True)
+
+        common.ddb_call("PUT", {"short_url": {"S": "def"}, "long_url": {"S": "https://example.org"}})
+        self.assertEqual(self.ddb.calls, {"put_item": 1})
+        self.assertEqual(self.dax.calls, {})
+
+    def test_dax_client_without_amazondax(self):
+        # amazondax is shipped in a Lambda layer, without it the reads stay on DynamoDB
+        with patch.dict(sys.modules, {"amazondax": None}):
+            self.assertIs(common.dax_client(), common.ddb)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb, configure
+from fake_ddb import FakeDynamoDB
+
+lambda_function = load_lambda("lambda_function")
+import common  # noqa: E402
+import shorten  # noqa: E402
+import unshorten  # noqa: E402
+from url_codec import mapping_item  # noqa: E402
+
+MAPPING_TABLE = common.settings.mapping_table
+NOW = 1600000000
+
+
+class TestExpiryOf(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(shorten, "time", return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_expiry(self):
+        self.assertEqual(shorten.expiry_of({}), [0, None])
+
+    def test_expires_in(self):
+        self.assertEqual(shorten.expiry_of({"expires_in": 3600}), [NOW + 3600, None])
+
+    def test_expires_at(self):
+        self.assertEqual(shorten.expiry_of({"expires_at": NOW + 60}), [NOW + 60, None])
+
+    def test_rejected(self):
+        for body in [
+            {"expires_in": 60, "expires_at": NOW + 60},
+            {"expires_in": 60.5},
+            {"expires_at": float(NOW + 60)},
+            {"expires_in": True},
+            {"expires_in": "60"},
+            {"expires_in": 0},
+            {"expires_in": -60},
+            {"expires_at": NOW},
+            {"expires_at": NOW - 60},
+        ]:
+            with self.subTest(body=body):
+                expires_at, failure = shorten.expiry_of(body)
+                self.assertIsNone(expires_at)
+                self.assertEqual(failure["statusCode"], "400")
+
+
+class TestExpiringShortUrls(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeDynamoDB()
+        use_ddb(self.fake)
+        self.settings = common.settings
+        configure(redirect_max_age=3600, redirect_s_maxage=86400)
+
+        for patcher in [patch.object(unshorten, "url_cache", unshorten.LRUCache(100, 300, 5)), patch.object(common, "time", return_value=NOW)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        configure(redirect_max_age=self.settings.redirect_max_age, redirect_s_maxage=self.settings.redirect_s_maxage)
+
+    def store(self, short_url, expires_at=0):
+        self.fake.put_item(TableName=MAPPING_TABLE, Item=mapping_item(short_url, "https://example.com/" + short_url, expires_at=expires_at))
+
+    def test_shorten_stores_expiry(self):
+        event = {"httpMethod": "POST", "path": "/shorten", "resource": "/shorten", "headers": {}, "requestContext": {"identity": {"sourceIp": "127.0.0.1"}},
+                 "body": json.dumps({"url_long": "https://example.com", "cdn_prefix": "https://cdn", "expires_in": 60})}
+
+        with patch.object(shorten, "time", return_value=NOW):
+            response = lambda_function.lambda_handler(event, None)
+
+        body = json.loads(response["body"])
+        self.assertEqual(body["expires_at"], NOW + 60)
+        self.assertEqual(self.fake.tables[MAPPING_TABLE][body["url_short"].split("/")[-1]]["expires_at"], {"N": str(NOW + 60)})
+
+    def test_never_expiring_redirect(self):
+        self.store("abc")
+
+        # Built once per container from the settings
+        self.assertEqual(unshorten.unshorten("abc")["headers"]["Cache-Control"], common.REDIRECT_CACHE_CONTROL)
+
+    def test_cache_capped_at_expiry(self):
+        self.store("abc", NOW + 7200)
+        self.store("xyz", NOW + 60)
+
+        self.assertEqual(unshorten.unshorten("abc")["headers"]["Cache-Control"], "public, max-age=3600, s-maxage=7200")
+        self.assertEqual(unshorten.unshorten("xyz")["headers"]["Cache-Control"], "public, max-age=60, s-maxage=60")
+
+    def test_expired(self):
+        # DynamoDB hasn't deleted the item yet
+        self.store("abc", NOW)
+
+        response = unshorten.unshorten("abc")
+        self.assertEqual(response["statusCode"], "410")
+        self.assertNotIn("Location", response["headers"])
+        self.assertEqual(response["headers"], common.NOT_FOUND_HEADERS)
+
+    def test_cached_mapping_expired(self):
+        self.store("abc", NOW + 60)
+        self.assertEqual(unshorten.unshorten("abc")["statusCode"], "301")
+
+        # Still in the container cache, but past its expiry
+        with patch.object(common, "time", return_value=NOW + 61):
+            self.assertEqual(unshorten.unshorten("abc")["statusCode"], "410")
+
+        self.assertEqual(self.fake.calls["get_item"], 1)
+
+    def test_batch_lists_expired(self):
+        self.store("abc", NOW + 60)
+        self.store("old", NOW - 60)
+
+        with patch.object(unshorten, "time", return_value=NOW):
+            body = json.loads(unshorten.unshorten_batch({"short_urls": ["abc", "old", "missing"]})["body"])
+
+        self.assertEqual(body["urls"], {"abc": "https://example.com/abc"})
+        self.assertEqual(body["expired"], ["old"])
+        self.assertEqual(body["missing"], ["missing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb
+from fake_ddb import FakeDynamoDB
+
+lambda_function = load_lambda("lambda_function")
+
+
+class TestRequestBodies(unittest.TestCase):
+
+    def setUp(self):
+        use_ddb(FakeDynamoDB())
+
+    def post(self, path, body):
+        event = {"httpMethod": "POST", "path": path, "resource": path, "body": json.dumps(body), "headers": {}, "requestContext": {"identity": {"sourceIp": "127.0.0.1"}}}
+
+        return lambda_function.lambda_handler(event, None)
+
+    def test_non_object_bodies(self):
+        for path in ("/shorten", "/shorten/batch", "/unshorten/batch"):
+            for body in ([1, 2], "url", 42, None):
+                with self.subTest(path=path, body=body):
+                    self.assertEqual(self.post(path, body)["statusCode"], "400")
+
+    def test_batch_unshorten(self):
+        response = self.post("/unshorten/batch", {"short_urls": ["missing"]})
+
+        self.assertEqual(response["statusCode"], "200")
+        self.assertEqual(json.loads(response["body"])["missing"], ["missing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb
+from fake_ddb import FakeDynamoDB, FakeClientError
+
+common = load_lambda("common")
+from retry_policy import RetryPolicy  # noqa: E402
+
+
+# Stand-ins named after botocore's exceptions, which the retry policy recognizes by name
+class EndpointConnectionError(Exception):
+    pass
+
+
+class ConnectionClosedError(Exception):
+    pass
+
+
+class ConnectTimeoutError(EndpointConnectionError):
+    pass
+
+
+class ReadTimeoutError(Exception):
+    pass
+
+
+class ParamValidationError(Exception):
+    pass
+
+
+class NoCredentialsError(Exception):
+    pass
+
+
+class NoRegionError(Exception):
+    pass
+
+
+class Context:
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(25, 1000, 10)
+
+    def test_classify_client_errors(self):
+        for code, error_class in [
+            ("ConditionalCheckFailedException", "conflict"),
+            ("ProvisionedThroughputExceededException", "throttle"),
+            ("ThrottlingException", "throttle"),
+            ("InternalServerError", "transient"),
+            ("ValidationException", "fatal"),
+            ("AccessDeniedException", "fatal"),
+            ("ResourceNotFoundException", "fatal"),
+        ]:
+            with self.subTest(code=code):
+                self.assertEqual(self.policy.classify(FakeClientError(code)), error_class)
+
+    def test_classify_cancelled_transactions(self):
+        for reasons, error_class in [
+            (["None", "ConditionalCheckFailed"], "conflict"),
+            (["ConditionalCheckFailed", "ThrottlingError"], "conflict"),
+            (["None", "TransactionConflict"], "throttle"),
+            (["ValidationError"], "fatal"),
+        ]:
+            with self.subTest(reasons=reasons):
+                error = FakeClientError("TransactionCanceledException", CancellationReasons=[{"Code": reason} for reason in reasons])
+                self.assertEqual(self.policy.classify(error), error_class)
+
+    def test_classify_errors_without_response(self):
+        for error, error_class in [
+            (EndpointConnectionError(), "transient"),
+            (ConnectionClosedError(), "transient"),
+            (ConnectTimeoutError(), "timeout"),
+            (ReadTimeoutError(), "timeout"),
+            (ParamValidationError(), "fatal"),
+            (NoCredentialsError(), "fatal"),
+            (NoRegionError(), "fatal"),
+            (KeyError("Attributes"), "fatal"),
+        ]:
+            with self.subTest(error=type(error).__name__):
+                self.assertEqual(self.policy.classify(error), error_class)
+
+    def test_backoff_capped(self):
+        with patch("retry_policy.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([round(self.policy.backoff(num_retry), 3) for num_retry in range(7)], [0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.0])
+
+    def test_backoff_jittered(self):
+        delays = {self.policy.backoff(3) for _ in range(100)}
+
+        self.assertTrue(all(0 <= delay <= 0.2 for delay in delays))
+        self.assertGreater(len(delays), 1)
+
+    def test_only_retryable_classes_retried(self):
+        self.assertFalse(self.policy.allow_retry("fatal", 0))
+        self.assertFalse(self.policy.allow_retry("conflict", 0))
+        self.assertEqual(self.policy.tokens, 10)
+
+    def test_budget_drain_and_refill(self):
+        self.assertTrue(self.policy.allow_retry("throttle", 0))
+        self.assertTrue(self.policy.allow_retry("transient", 0))
+        self.assertFalse(self.policy.allow_retry("throttle", 0))
+
+        for _ in range(4):
+            self.policy.record_success()
+        self.assertFalse(self.policy.allow_retry("throttle", 0))
+
+        self.policy.record_success()
+        self.assertTrue(self.policy.allow_retry("throttle", 0))
+
+    def test_budget_refill_capped(self):
+        for _ in range(100):
+            self.policy.record_success()
+
+        self.assertEqual(self.policy.tokens, 10)
+
+    def test_timeouts_cost_more(self):
+        self.assertTrue(self.policy.allow_retry("timeout", 0))
+        self.assertFalse(self.policy.allow_retry("timeout", 0))
+
+    def test_deadline(self):
+        self.policy.start_invocation(Context(1000))
+
+        # 500ms are left once the margin is taken off
+        self.assertTrue(self.policy.allow_retry("throttle", 0.4))
+        self.assertFalse(self.policy.allow_retry("throttle", 0.6))
+
+    def test_deadline_counts_attempt_timeout(self):
+        policy = RetryPolicy(25, 1000, 500, attempt_timeout=3)
+
+        with patch("retry_policy.monotonic", return_value=100.0):
+            policy.start_invocation(Context(5000))
+            self.assertTrue(policy.allow_retry("timeout", 0.5))
+
+        # After a 2s read timeout, another attempt could still be running when Lambda times out the invocation
+        with patch("retry_policy.monotonic", return_value=102.0):
+            self.assertFalse(policy.allow_retry("timeout", 0))
+
+    def test_no_deadline_without_context(self):
+        self.policy.start_invocation(None)
+
+        self.assertIsNone(self.policy.deadline)
+        self.assertTrue(self.policy.allow_retry("throttle", 60))
+
+
+class FlakyDynamoDB(FakeDynamoDB):
+    # Raises the given errors, one per call, before serving the calls as usual
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def get_item(self, **kwargs):
+        if self.errors:
+            self._call('get_item')
+            raise self.errors.pop(0)
+
+        return super().get_item(**kwargs)
+
+
+class TestDdbAttempts(unittest.TestCase):
+
+    GET = {"short_url": {"S": "abc"}}
+
+    def setUp(self):
+        self.policy = RetryPolicy(25, 1000, 500)
+        self.policy.start_invocation(None)
+
+        patchers = [patch.object(common, "retry_policy", self.policy), patch.object(common, "sleep")]
+        for patcher in patchers:
+            self.sleep = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use(self, errors):
+        fake = FlakyDynamoDB(errors)
+        fake.put_item(TableName=common.settings.mapping_table, Item={"short_url": {"S": "abc"}, "long_url": {"S": "https://example.com"}})
+        use_ddb(fake)
+
+        return fake
+
+    def test_retried_until_success(self):
+        fake = self.use([FakeClientError("ProvisionedThroughputExceededException"), EndpointConnectionError()])
+
+        self.assertEqual(common.ddb_attempts("GET", self.GET), [("https://example.com", 0), None])
+        self.assertEqual(fake.calls["get_item"], 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(self.policy.tokens, 491)
+
+    def test_fatal_not_retried(self):
+        fake = self.use([ParamValidationError()])
+
+        mapping, failure = common.ddb_attempts("GET", self.GET)
+        self.assertIsNone(mapping)
+        self.assertEqual(failure["statusCode"], "500")
+        self.assertEqual(fake.calls["get_item"], 1)
+
+    def test_max_retries(self):
+        fake = self.use([FakeClientError("InternalServerError")] * 10)
+
+        self.assertEqual(common.ddb_attempts("GET", self.GET)[1]["statusCode"], "500")
+        self.assertEqual(fake.calls["get_item"], common.settings.max_retries)
+
+    def test_exhausted_budget(self):
+        fake = self.use([FakeClientError("InternalServerError")] * 10)
+        self.policy.tokens = 0
+
+        self.assertEqual(common.ddb_attempts("GET", self.GET)[1]["statusCode"], "500")
+        self.assertEqual(fake.calls["get_item"], 1)
+
+    def test_put_conflict(self):
+        fake = self.use([])
+
+        result = common.ddb_attempts("PUT", {"short_url": {"S": "abc"}, "long_url": {"S": "https://example.org"}})
+        self.assertEqual(result["statusCode"], "409")
+        self.assertEqual(fake.calls["put_item"], 2)
+        self.sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
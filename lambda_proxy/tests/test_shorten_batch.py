@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bench"))
+from bench_common import load_lambda, use_ddb, configure
+from fake_ddb import FakeDynamoDB
+
+shorten = load_lambda("shorten")
+common = load_lambda("common")
+from url_codec import mapping_item, long_url_of  # noqa: E402
+
+MAPPING_TABLE = shorten.settings.mapping_table
+
+
+# Stand-in named after botocore's exception, which the retry policy recognizes by name
+class ReadTimeoutError(Exception):
+    pass
+
+
+class TimingOutDynamoDB(FakeDynamoDB):
+    # Commits the first transaction but times out before its response arrives
+    def transact_write_items(self, **kwargs):
+        response = super().transact_write_items(**kwargs)
+
+        if self.calls['transact_write_items'] == 1:
+            raise ReadTimeoutError()
+
+        return response
+
+
+class TestShortenBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeDynamoDB()
+        use_ddb(self.fake)
+        shorten.counter_block.update(next=0, end=0)
+
+    def tearDown(self):
+        configure(code_alphabet="hex", code_length=0, dedupe=False, max_retries=3)
+
+    def shorten_batch(self, urls, expires_at=0):
+        response = shorten.shorten_batch(urls, "https://cdn", "127.0.0.1", expires_at)
+        self.assertEqual(response["statusCode"], "200")
+
+        return json.loads(response["body"])["results"]
+
+    def assert_stored(self, results):
+        # Every Short URL handed out redirects to its own Long URL
+        table = self.fake.tables[MAPPING_TABLE]
+
+        for result in results:
+            if "url_short" in result:
+                self.assertEqual(long_url_of(table[result["url_short"].split("/")[-1]]), result["url_long"])
+
+    def test_batch(self):
+        results = self.shorten_batch(["https://example.com/a", "", "https://example.com/b"])
+
+        self.assertEqual([result["url_long"] for result in results], ["https://example.com/a", "", "https://example.com/b"])
+        self.assertIn("error", results[1])
+        self.assertTrue(all(result["url_short"].startswith("https://cdn/") for result in (results[0], results[2])))
+        self.assert_stored(results)
+        self.assertEqual(self.fake.calls["transact_write_items"], 1)
+
+    def test_collisions_never_overwrite(self):
+        # 62 possible codes, so that the batch collides with itself and with the table
+        configure(code_alphabet="base62", code_length=1, max_retries=10)
+        self.shorten_batch([f"https://example.com/first/{i}" for i in range(20)])
+
+        results = self.shorten_batch([f"https://example.com/{i}" for i in range(25)])
+        short_urls = [result["url_short"] for result in results if "url_short" in result]
+
+        self.assertEqual(len(short_urls), len(set(short_urls)))
+        self.assert_stored(results)
+        self.assertEqual(len(self.fake.tables[MAPPING_TABLE]), 20 + len(short_urls))
+
+    def test_taken_code_regenerated(self):
+        # The first unique value of the batch is 1
+        taken = shorten.hash_url("https://example.com/a", "127.0.0.1", "1")
+        self.fake.put_item(TableName=MAPPING_TABLE, Item=mapping_item(taken, "https://example.com/other"))
+
+        results = self.shorten_batch(["https://example.com/a", "https://example.com/b"])
+
+        self.assertNotEqual(results[0]["url_short"], "https://cdn/" + taken)
+        self.assertEqual(long_url_of(self.fake.tables[MAPPING_TABLE][taken]), "https://example.com/other")
+        self.assertEqual(self.fake.calls["transact_write_items"], 2)
+        self.assert_stored(results)
+
+    def test_free_code_exhaustion(self):
+        configure(code_alphabet="hex", code_length=1, max_retries=3)
+        results = self.shorten_batch([f"https://example.com/{i}" for i in range(40)])
+
+        self.assertLessEqual(sum("url_short" in result for result in results), 16)
+        self.assertTrue(all("url_short" in result or "error" in result for result in results))
+        self.assert_stored(results)
+
+    def test_transaction_size(self):
+        results = self.shorten_batch([f"https://example.com/{i}" for i in range(60)])
+
+        self.assertEqual(self.fake.calls["transact_write_items"], 3)
+        self.assertEqual(len(self.fake.tables[MAPPING_TABLE]), 60)
+        self.assert_stored(results)
+
+    def test_retry_of_committed_transaction(self):
+        self.fake = TimingOutDynamoDB()
+        use_ddb(self.fake)
+
+        with patch.object(common, "sleep"):
+            results = self.shorten_batch(["https://example.com/a", "https://example.com/b"])
+
+        # The retry carries the same token, so the committed mappings are neither reported taken nor written again
+        self.assertEqual(self.fake.calls["transact_write_items"], 2)
+        self.assertEqual(len(self.fake.tables[MAPPING_TABLE]), 2)
+        self.assertTrue(all("url_short" in result for result in results))
+        self.assert_stored(results)
+
+    def test_dedupe(self):
+        configure(dedupe=True)
+        existing = self.shorten_batch(["https://example.com/a"])[0]["url_short"]
+
+        results = self.shorten_batch(["https://example.com/a", "https://example.com/b", "https://example.com/b"])
+
+        self.assertEqual(results[0]["url_short"], existing)
+        self.assertEqual(results[1]["url_short"], results[2]["url_short"])
+        self.assertEqual(len(self.fake.tables[MAPPING_TABLE]), 2)
+
+    def test_expiring_batch_not_deduped(self):
+        configure(dedupe=True)
+        existing = self.shorten_batch(["https://example.com/a"])[0]["url_short"]
+
+        results = self.shorten_batch(["https://example.com/a"], expires_at=4102444800)
+
+        self.assertNotEqual(results[0]["url_short"], existing)
+        self.assertEqual(self.fake.tables[MAPPING_TABLE][results[0]["url_short"].split("/")[-1]]["expires_at"], {"N": "4102444800"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import json
+from time import sleep, time, perf_counter
+from common import settings, retry_policy, timing, handle, ddb_helper, redirect_response, JSON_HEADERS
+from lru_cache import LRUCache, MISS
+from url_codec import long_url_of, expires_at_of
+from click_stream import ClickStream, sqs_client
+
+# Short URL -> (Long URL, expiry) mappings (None for unknown Short URLs) of this warm container
+url_cache = LRUCache(settings.cache_size, settings.cache_ttl, settings.cache_negative_ttl)
+
+# Redirects served by this container, sent to the click analytics queue in the background when one is configured
+click_stream = ClickStream(settings.clicks_queue_url, sqs_client, settings.click_batch_size, settings.click_flush_seconds) if settings.clicks_queue_url else None
+
+def lambda_handler(event, context):
+    return handle(event, context, route)
+    
+def route(request):
+    # Unshorten up to BATCH_MAX_URLS short URLs at once
+    if request.route == '/unshorten/batch':
+        started = perf_counter()
+        body = json.loads(request.body)
+        timing.record('parse', started)
+        
+        return unshorten_batch(body)
+    
+    # Unshorten and return the long URL
+    return unshorten(request.path.split('/')[2], request.headers)
+    
+def unshorten(short_url, headers=None):
+    timing.set(action='unshorten')
+    
+    # Serve the Long URL (or the 404) straight from the container cache when possible
+    started = perf_counter()
+    mapping = url_cache.get(short_url)
+    timing.record('cache_lookup', started)
+    
+    cache_outcome = "hit" if mapping is not MISS else "miss"
+    timing.count('cache_hits' if mapping is not MISS else 'cache_misses')
+    failure = None
+    
+    if mapping is MISS:
+        payload = {
+            'short_url': {
+                'S': short_url
+            }
+        }
+        
+        # Get the Long URL and its expiry from the DDB table
+        mapping, failure = ddb_helper("GET", payload)
+        
+        # Cache mappings as well as unknown Short URLs, but never failures
+        if failure is None:
+            url_cache.put(short_url, mapping)
+    
+    # The expiry is checked on every request, cached mappings (as DynamoDB's items) outliving it are answered with a 410
+    result = failure or (redirect_response(*mapping) if mapping else redirect_response(None))
+    
+    # With click analytics, CloudFront doesn't cache the redirects (s-maxage=0), so that every redirect is counted here
+    if click_stream is not None and result['statusCode'] == '301':
+        click_stream.record(short_url, headers or {})
+        timing.count('clicks')
+    
+    # Logged with the EMF line of the invocation, which the edge hot-set is built from
+    timing.set(short_url=short_url, cache=cache_outcome, cache_stats=url_cache.metrics())
+    
+    return result
+    
+def unshorten_batch(body):
+    '''
+    Resolve many Short URLs at once into a Short URL -> Long URL map, using the container cache first
+    and BatchGetItem for the rest; unknown Short URLs are listed under "missing" and expired ones under "expired";
+    '''
+    short_urls = body.get('short_urls') if isinstance(body, dict) else None
+    
+    if not isinstance(short_urls, list) or not 0 < len(short_urls) <= settings.batch_max_urls or not all(isinstance(short_url, str) and short_url for short_url in short_urls):
+        return {
+            'statusCode': '400',
+            'headers': JSON_HEADERS,
+            'body': json.dumps({"error": f"short_urls must be a list of 1 to {settings.batch_max_urls} short URLs"})
+        }
+    
+    timing.set(action='unshorten_batch')
+    timing.count('urls', len(short_urls))
+    mappings, pending = {}, []
+    
+    # BatchGetItem rejects duplicate keys, so every Short URL is looked up once
+    started = perf_counter()
+    for short_url in dict.fromkeys(short_urls):
+        mapping = url_cache.get(short_url)
+        
+        if mapping is MISS:
+            pending.append(short_url)
+        else:
+            mappings[short_url] = mapping
+    timing.record('cache_lookup', started)
+    
+    timing.count('cache_hits', len(mappings))
+    timing.count('cache_misses', len(pending))
+    
+    # BatchGetItem accepts up to 100 keys per call
+    failed = []
+    for i in range(0, len(pending), 100):
+        found, unprocessed = batch_get(pending[i:i + 100])
+        
+        for short_url in pending[i:i + 100]:
+            if short_url in unprocessed:
+                failed.append(short_url)
+            else:
+                mappings[short_url] = found.get(short_url)
+                url_cache.put(short_url, mappings[short_url])
+    
+    now = int(time())
+    expired = {short_url for short_url, mapping in mappings.items() if mapping and 0 < mapping[1] <= now}
+    
+    return {
+        'statusCode': '200',
+        'headers': JSON_HEADERS,
+        'body': json.dumps(
+            {
+                "urls": {short_url: mapping[0] for short_url, mapping in mappings.items() if mapping and short_url not in expired},
+                "missing": [short_url for short_url, mapping in mappings.items() if mapping is None],
+                "expired": [short_url for short_url in mappings if short_url in expired],
+                "failed": failed
+            }
+        )
+    }
+    
+def batch_get(short_urls):
+    '''
+    Read the mapping items with BatchGetItem, resubmitting the unprocessed keys with backoff;
+    returns the Short URL -> (Long URL, expiry) map of the items found and the Short URLs that still couldn't be read;
+    '''
+    keys, found = [{'short_url': {'S': short_url}} for short_url in short_urls], {}
+    
+    for num_retry in range(settings.max_retries):
+        res = ddb_helper("BATCH_GET", keys)
+        
+        if res[1]:
+            break
+        
+        items, keys = res[0]
+        found.update((item['short_url']['S'], (long_url_of(item), expires_at_of(item))) for item in items)
+        
+        if not keys:
+            break
+        
+        # Unprocessed keys are DynamoDB throttling part of the batch, so they go through the retry policy as well
+        delay = retry_policy.backoff(num_retry)
+        
+        if not retry_policy.allow_retry('throttle', delay):
+            break
+        
+        print(f"{len(keys)} keys were left unprocessed by DynamoDB BATCH_GET API. Retrying..")
+        timing.count('retries')
+        sleep(delay)
+    
+    return found, {key['short_url']['S'] for key in keys}
@@ -0,0 +1,114 @@
+import zlib
+from hashlib import blake2b
+
+# Codec of an encoded Long URL, stored in the first byte of the binary attribute; a codec id is tied to its exact
+# dictionary, so URL_DICTIONARY must never be edited in place: a new dictionary gets a new codec id
+PLAIN, ZLIB, ZSTD = 0, 1, 2
+CODECS = {'plain': PLAIN, 'zlib': ZLIB, 'zstd': ZSTD}
+
+# Short name of the binary attribute holding an encoded Long URL (plain items keep the "long_url" string attribute)
+ENCODED_ATTRIBUTE = 'l'
+
+# Preset dictionary of common URL fragments, which a Long URL is compressed against so that even a single URL
+# compresses well; the most frequent fragments come last, as they're then the cheapest to reference
+URL_DICTIONARY = (
+    b"/index.html/product/item/article/blog/news/post/watch?v=/search?q=/share?/redirect?url=/click?/track?"
+    b"&ref=&ref_src=&source=&src=&lang=en&locale=en_US&country=us&currency=USD&page=&sort=&id=&pid=&sku=&tag="
+    b"&fbclid=&gclid=&msclkid=&dclid=&mc_cid=&mc_eid=&_hsenc=&_hsmi=&trk=&cmp=&cid=&sid=&uid=&session_id="
+    b"&utm_id=&utm_term=&utm_content=&utm_campaign=&utm_medium=email&utm_medium=social&utm_medium=cpc"
+    b"&utm_source=newsletter&utm_source=twitter&utm_source=facebook&utm_source=google&utm_source=linkedin"
+    b".html.php.aspx.pdf.jpg.png.org/.net/.io/.co.uk/.de/.fr/.com/amazon.com/youtube.com/docs.google.com/"
+    b"https://www.youtube.com/watch?v=https://www.amazon.com/dp/https://www.linkedin.com/https://twitter.com/"
+    b"?utm_source=&utm_medium=&utm_campaign=https://www.http://www.https://"
+)
+
+def encode(long_url, encoding):
+    '''
+    Encode the Long URL with the given codec ("zlib" or "zstd") into the binary value of the encoded attribute;
+    URLs too short to shrink are stored uncompressed, behind the PLAIN codec byte;
+    '''
+    raw = long_url.encode()
+
+    if encoding == 'zstd' and zstd_codec():
+        data = bytes([ZSTD]) + zstd_codec()[0].compress(raw)
+    else:
+        # Raw deflate stream (negative wbits), without the zlib header and checksum
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=URL_DICTIONARY)
+        data = bytes([ZLIB]) + compressor.compress(raw) + compressor.flush()
+
+    return data if len(data) <= len(raw) else bytes([PLAIN]) + raw
+
+def decode(data):
+    # The first byte tells the codec the rest of the value was encoded with
+    codec, payload = data[0], bytes(data[1:])
+
+    if codec == ZLIB:
+        return zlib.decompressobj(-15, zdict=URL_DICTIONARY).decompress(payload).decode()
+
+    if codec == ZSTD:
+        if not zstd_codec():
+            raise ValueError("A zstd encoded Long URL can't be decoded without the zstandard package")
+
+        return zstd_codec()[1].decompress(payload).decode()
+
+    return payload.decode()
+
+def long_url_attributes(long_url, encoding):
+    # Attributes of a mapping item holding the Long URL, as per the URL_ENCODING setting
+    if encoding == 'plain':
+        return {'long_url': {'S': long_url}}
+
+    return {ENCODED_ATTRIBUTE: {'B': encode(long_url, encoding)}}
+
+def mapping_item(short_url, long_url, encoding='plain', dedupe=False, expires_at=0):
+    '''
+    Mapping item of the Short URL, as written by the shorten API and the bulk import tool alike;
+    with dedupe, the digest of the Long URL is added for the GSI serving a repeated Long URL with a single read;
+    an expiring Short URL carries its expiry (epoch seconds) in the expires_at TTL attribute instead, which keeps it
+    out of the GSI, so that a repeated Long URL is never answered with a Short URL that expires;
+    '''
+    item = {'short_url': {'S': short_url}}
+    item.update(long_url_attributes(long_url, encoding))
+
+    if expires_at:
+        item['expires_at'] = {'N': str(expires_at)}
+    elif dedupe:
+        item['long_url_hash'] = {'S': long_url_digest(long_url)}
+
+    return item
+
+def long_url_digest(long_url):
+    return blake2b(long_url.encode(), digest_size=16).hexdigest()
+
+def long_url_of(item):
+    # Items of both layouts can live in the same table, ex: after switching URL_ENCODING
+    if 'long_url' in item:
+        return item['long_url']['S']
+
+    return decode(item[ENCODED_ATTRIBUTE]['B'])
+
+def expires_at_of(item):
+    # Expiry of the Short URL in epoch seconds, 0 if it never expires
+    return int(item['expires_at']['N']) if 'expires_at' in item else 0
+
+_zstd = []
+
+def zstd_codec():
+    '''
+    Return the zstd (compressor, decompressor) pair sharing URL_DICTIONARY, built on first use; zstandard is an
+    optional dependency, so None is returned without it and the "zstd" encoding falls back to zlib;
+    '''
+    if not _zstd:
+        try:
+            import zstandard
+
+            dictionary = zstandard.ZstdCompressionDict(URL_DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+            _zstd.append((
+                zstandard.ZstdCompressor(level=19, dict_data=dictionary, write_checksum=False, write_dict_id=False),
+                zstandard.ZstdDecompressor(dict_data=dictionary),
+            ))
+        except ImportError:
+            print("zstandard isn't available, zstd encoded Long URLs fall back to zlib.")
+            _zstd.append(None)
+
+    return _zstd[0]
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+'''
+Imports existing (Short URL, Long URL) pairs, ex: from another URL shortener, into the mapping table.
+
+The input is streamed (CSV with short_url,long_url columns, or JSON lines with "short_url" and "long_url" keys,
+either with an optional expires_at in epoch seconds),
+invalid rows are reported and skipped, and the items are written with parallel BatchWriteItem workers
+rate-limited to a target WCU. Progress is saved to a checkpoint file, so that an interrupted import resumes
+where it stopped. Imported Short URLs overwrite existing items with the same Short URL;
+
+    $ python tools/bulk_import.py mappings.csv --table <mapping table> --wcu 1000 --workers 8
+    $ python tools/bulk_import.py mappings.jsonl --table <mapping table> --endpoint-url http://localhost:8000
+'''
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from time import monotonic, sleep, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda_proxy"))
+
+from url_codec import mapping_item  # noqa: E402
+
+# Short URLs the shorten API could have generated, plus the "-" and "_" found in other shorteners' codes
+CODE_PATTERN = r"[A-Za-z0-9_-]{1,128}"
+
+# Long URLs are redirected to as is, so they must be absolute HTTP(S) URLs
+LONG_URL_PATTERN = re.compile(r"https?://[^\s]+", re.IGNORECASE)
+MAX_LONG_URL_LENGTH = 8192
+
+
+class RateLimiter:
+    '''
+    Token bucket of write capacity units shared by the workers, refilled at the target WCU per second;
+    a batch waits until the bucket holds the units it's going to consume;
+    '''
+    def __init__(self, units_per_second):
+        self.rate = units_per_second
+        self.tokens = units_per_second
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units):
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                # A batch bigger than the bucket itself goes through once the bucket is full
+                if self.tokens >= min(units, self.rate):
+                    self.tokens -= units
+                    return
+
+                missing = min(units, self.rate) - self.tokens
+
+            sleep(missing / self.rate)
+
+
+class Checkpoint:
+    '''
+    Tracks the batches written out of order by the workers and saves the line number up to which
+    every row has been written (or rejected), which is where a resumed import starts from;
+    '''
+    def __init__(self, path, input_path):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.line = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path) as fp:
+                state = json.load(fp)
+
+            if state["input"] != self.input_path:
+                raise ValueError(f"The checkpoint {path} belongs to the import of {state['input']}")
+
+            self.line = state["line"]
+
+    def done(self, first_line, last_line):
+        # Batches complete out of order, the checkpoint only moves over contiguous lines
+        with self.lock:
+            self.pending[first_line] = last_line
+
+            while self.line + 1 in self.pending:
+                self.line = self.pending.pop(self.line + 1)
+
+    def save(self, stats):
+        if not self.path:
+            return
+
+        with self.lock:
+            state = dict(stats, input=self.input_path, line=self.line)
+
+        # Written aside and renamed, so that an interruption never leaves a truncated checkpoint
+        with open(self.path + ".tmp", "w") as fp:
+            json.dump(state, fp)
+
+        os.replace(self.path + ".tmp", self.path)
+
+
+def read_rows(path, input_format):
+    # Yields (line number, Short URL, Long URL, expiry) one row at a time, malformed rows having None values
+    with open(path, newline="", encoding="utf-8") as fp:
+        if input_format == "jsonl":
+            for line_number, line in enumerate(fp, 1):
+                try:
+                    row = json.loads(line)
+                    yield line_number, row.get("short_url"), row.get("long_url"), row.get("expires_at")
+                except (ValueError, AttributeError):
+                    yield line_number, None, None, None
+
+        else:
+            for line_number, row in enumerate(csv.reader(fp), 1):
+                # Optional header row
+                if line_number == 1 and row[:2] == ["short_url", "long_url"]:
+                    continue
+
+                short_url, long_url, expires_at = (row + [None, None, None])[:3] if len(row) >= 2 else (None, None, None)
+
+                # The expires_at column is optional, and can be empty for the rows that never expire
+                yield line_number, short_url, long_url, expires_at or None
+
+
+def validate(short_url, long_url, expires_at, code_pattern, now):
+    # Returns the reason the row is rejected, or None if it's valid
+    if not isinstance(short_url, str) or not code_pattern.fullmatch(short_url):
+        return "invalid short_url"
+
+    if not isinstance(long_url, str) or len(long_url) > MAX_LONG_URL_LENGTH or not LONG_URL_PATTERN.fullmatch(long_url):
+        return "invalid long_url"
+
+    if expires_at is not None:
+        if isinstance(expires_at, bool) or not re.fullmatch(r"[0-9]{1,12}", str(expires_at)):
+            return "invalid expires_at"
+
+        # Imported expired Short URLs would only be answered with a 410 until DynamoDB deletes them
+        if int(expires_at) <= now:
+            return "expired"
+
+    return None
+
+
+def batches(rows, start_line, code_pattern, encoding, dedupe, rejects, stats):
+    '''
+    Groups the valid rows after start_line into batches of up to 25 items (the BatchWriteItem limit),
+    yielding (first line, last line, items); a Short URL repeated within a batch keeps its last Long URL,
+    as BatchWriteItem rejects duplicate keys;
+    '''
+    # Batches cover contiguous line ranges (including rejected rows), so that the checkpoint can move over all of them
+    first_line, last_line = start_line + 1, start_line
+    items = {}
+    now = int(time())
+
+    for line_number, short_url, long_url, expires_at in rows:
+        if line_number < first_line:
+            continue
+
+        last_line = line_number
+        reason = validate(short_url, long_url, expires_at, code_pattern, now)
+
+        if reason:
+            stats["rejected"] += 1
+            rejects.write(json.dumps({"line": line_number, "reason": reason, "short_url": short_url, "long_url": long_url, "expires_at": expires_at}) + "\n")
+        else:
+            items[short_url] = mapping_item(short_url, long_url, encoding, dedupe, int(expires_at or 0))
+
+        if len(items) == 25:
+            yield first_line, line_number, list(items.values())
+            first_line, items = line_number + 1, {}
+
+    if last_line >= first_line:
+        yield first_line, last_line, list(items.values())
+
+
+def item_units(item):
+    # Write capacity units of a PutRequest: 1 per started KB of attribute names and values
+    size = 0
+    for name, value in item.items():
+        # Numbers (expires_at) are counted by their digits, which slightly overestimates them
+        size += len(name) + len(value["S"].encode() if "S" in value else value.get("B", value.get("N")))
+
+    return math.ceil(size / 1024)
+
+
+def write_batch(client, table, items, limiter, index_units, max_retries):
+    '''
+    Write the items with BatchWriteItem, resubmitting the unprocessed ones with jittered exponential backoff;
+    raises once max_retries attempts couldn't write them all, which stops the import;
+    '''
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+
+    for num_retry in range(max_retries):
+        limiter.acquire(sum(item_units(request["PutRequest"]["Item"]) * index_units for request in requests))
+
+        try:
+            response = client.batch_write_item(RequestItems={table: requests})
+            requests = response.get("UnprocessedItems", {}).get(table, [])
+        except Exception as e:
+            # Throttling and connection errors leave the whole batch to be retried
+            print(f"BatchWriteItem failed, retrying the batch..\n{e}", file=sys.stderr)
+
+        if not requests:
+            return
+
+        sleep(random.uniform(0, min(20, 0.05 * 2 ** num_retry)))
+
+    raise RuntimeError(f"{len(requests)} items couldn't be written after {max_retries} attempts")
+
+
+def run(client, args):
+    code_pattern = re.compile(args.code_pattern)
+    limiter = RateLimiter(args.wcu)
+    checkpoint = Checkpoint(args.checkpoint, args.input)
+    stats = {"written": 0, "rejected": 0}
+    input_format = args.format or ("jsonl" if args.input.endswith((".jsonl", ".json")) else "csv")
+
+    # With dedupe, every item is written to the Long URL digest GSI as well, which is budgeted alike
+    index_units = 2 if args.dedupe else 1
+
+    if checkpoint.line:
+        print(f"Resuming after line {checkpoint.line} of {args.input}.")
+
+    started, last_report = monotonic(), monotonic()
+
+    with open(args.rejects, "a") as rejects, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        in_flight = {}
+
+        def collect(futures):
+            nonlocal last_report
+
+            for future in futures:
+                first_line, last_line, count = in_flight.pop(future)
+
+                # A batch that couldn't be written stops the import, the checkpoint stays before it
+                future.result()
+
+                checkpoint.done(first_line, last_line)
+                stats["written"] += count
+
+            if monotonic() - last_report >= args.report_seconds:
+                checkpoint.save(stats)
+                elapsed = monotonic() - started
+                print(f"{stats['written']} written, {stats['rejected']} rejected, up to line {checkpoint.line} ({stats['written'] / elapsed:.0f} items/s)")
+                last_report = monotonic()
+
+        rows = read_rows(args.input, input_format)
+
+        try:
+            for first_line, last_line, items in batches(rows, checkpoint.line, code_pattern, args.encoding, args.dedupe, rejects, stats):
+                # Bounded number of batches in flight, so that memory stays constant whatever the input size
+                if len(in_flight) >= args.workers * 2:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+
+                if items:
+                    future = executor.submit(write_batch, client, args.table, items, limiter, index_units, args.max_retries)
+                else:
+                    # Batches of rejected rows only still move the checkpoint
+                    future = executor.submit(lambda: None)
+
+                in_flight[future] = (first_line, last_line, len(items))
+
+            collect(wait(in_flight).done)
+
+        finally:
+            # Whatever happens, the progress made so far is kept
+            checkpoint.save(stats)
+
+    print(f"Imported {stats['written']} items and rejected {stats['rejected']} rows (see {args.rejects}) in {monotonic() - started:.1f}s.")
+
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSON lines file of short_url, long_url pairs")
+    parser.add_argument("--table", required=True, help="name of the mapping table")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from the file extension)")
+    parser.add_argument("--encoding", choices=["plain", "zlib", "zstd"], default="plain", help="URL_ENCODING of the deployed stack")
+    parser.add_argument("--dedupe", action="store_true", help="add the Long URL digest, when the stack is deployed with dedupe")
+    parser.add_argument("--wcu", type=float, default=1000, help="target write capacity units per second")
+    parser.add_argument("--workers", type=int, default=8, help="parallel BatchWriteItem workers")
+    parser.add_argument("--max-retries", type=int, default=10, help="attempts to write a batch before stopping the import")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument("--rejects", help="file the invalid rows are appended to (default: <input>.rejects)")
+    parser.add_argument("--code-pattern", default=CODE_PATTERN, help="regular expression valid Short URLs match")
+    parser.add_argument("--report-seconds", type=float, default=10, help="seconds between progress reports and checkpoints")
+    parser.add_argument("--region", help="AWS region of the mapping table")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint, ex: DynamoDB Local")
+    args = parser.parse_args(argv)
+
+    args.checkpoint = args.checkpoint or args.input + ".checkpoint"
+    args.rejects = args.rejects or args.input + ".rejects"
+
+    return args
+
+
+def main(argv=None, client=None):
+    # The DynamoDB client can be given, ex: an in-memory stand-in
+    args = parse_args(argv)
+
+    if client is None:
+        import boto3
+
+        client = boto3.client("dynamodb", region_name=args.region, endpoint_url=args.endpoint_url)
+
+    return run(client, args)
+
+
+if __name__ == "__main__":
+    main()